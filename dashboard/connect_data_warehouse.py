@@ -1,10 +1,104 @@
+import hashlib
+import os
 from pathlib import Path
+import shutil
+import threading
 import duckdb
 
 # data warehouse directory
-db_path = Path("/mnt/data/job_ads.duckdb")
- 
+db_path = Path(os.getenv("DUCKDB_PATH", "/mnt/data/job_ads.duckdb"))
+
+# the pipeline publishes every finished build as snapshots/<version>/job_ads.duckdb
+# and names the newest one in snapshots/CURRENT, so the dashboard never reads the
+# file the pipeline is writing to
+snapshot_dir = Path(os.getenv("DUCKDB_SNAPSHOT_DIR", db_path.parent / "snapshots"))
+
+# published snapshots are copied to local disk once, so queries do not read every
+# block over the file share; DUCKDB_LOCAL_CACHE_DIR="" turns this off
+local_cache_dir = os.getenv("DUCKDB_LOCAL_CACHE_DIR", "/tmp/warehouse_cache")
+
+_lock = threading.Lock()
+# the copy queries use (its marker and path) and the one before it, the newest
+# snapshot asked for, and the markers of the copies still in flight
+_local = {"marker": None, "path": None, "previous": None, "newest": None, "copying": set()}
+
+
+def current_db_path():
+    """Newest published snapshot, or the pipeline's own file if nothing is published yet."""
+    try:
+        version = (snapshot_dir / "CURRENT").read_text().strip()
+    except FileNotFoundError:
+        return db_path
+    return snapshot_dir / version / db_path.name
+
+
+def _local_copy_dir(marker):
+    # one directory per snapshot
+    return Path(local_cache_dir) / hashlib.sha1(marker.encode()).hexdigest()[:16]
+
+
+def _local_copy_path(remote, marker):
+    # the file keeps its name (views refer to the database by it)
+    return _local_copy_dir(marker) / remote.name
+
+
+def _copy_to_local(remote, marker):
+    local = _local_copy_path(remote, marker)
+    try:
+        local.parent.mkdir(parents=True, exist_ok=True)
+        partial = local.with_name(f"{local.name}.partial")
+        shutil.copyfile(remote, partial)
+        os.replace(partial, local)
+    except OSError:
+        with _lock:
+            _local["copying"].discard(marker)  # try again with the next query
+        return
+    _switch_to(local, marker)
+
+
+def _switch_to(local, marker):
+    with _lock:
+        _local["copying"].discard(marker)
+        # a copy that finishes after a newer snapshot was asked for is not switched to
+        if marker == _local["newest"]:
+            _local.update(marker=marker, path=local, previous=_local["path"])
+        # queries may still be reading the current copy and the one before, and
+        # copies in flight need their directories; anything else is unused
+        keep = {path.parent for path in (_local["path"], _local["previous"]) if path}
+        keep |= {_local_copy_dir(copying) for copying in _local["copying"]}
+        unused = [old_dir for old_dir in Path(local_cache_dir).iterdir() if old_dir not in keep]
+    for old_dir in unused:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def query_db_path():
+    """Database to run the next queries against: the local copy of the newest snapshot.
+
+    Checking for a new snapshot costs a read of CURRENT and a stat. A new one is
+    copied in the background while queries keep using the previous local copy
+    (or the file share, before the first copy is done), then queries switch over.
+    """
+    remote = current_db_path()
+    if not local_cache_dir or remote == db_path:
+        return remote  # only published snapshots are immutable and safe to copy
+    stat = remote.stat()
+    marker = f"{remote}:{stat.st_size}:{stat.st_mtime_ns}"
+    with _lock:
+        _local["newest"] = marker
+        if _local["marker"] == marker:
+            return _local["path"]
+        start_copy = marker not in _local["copying"]
+        if start_copy:
+            _local["copying"].add(marker)
+    if start_copy:
+        local = _local_copy_path(remote, marker)
+        if local.exists():
+            _switch_to(local, marker)  # copied before a restart
+            return local
+        threading.Thread(target=_copy_to_local, args=(remote, marker), daemon=True).start()
+    return _local["path"] or remote
+
 
 def get_job_listings(query='SELECT * FROM marts.mart_technical_jobs'):
-    with duckdb.connect(db_path, read_only=True) as conn:
-        return conn.query(f"{query}").df()
\ No newline at end of file
+    with duckdb.connect(query_db_path(), read_only=True) as conn:
+        return conn.query(f"{query}").df()
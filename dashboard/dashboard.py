@@ -1,13 +1,15 @@
 import streamlit as st
 import duckdb
-import os
-from pathlib import Path
+
+from connect_data_warehouse import query_db_path
 
 # =======================
 #   Database setup
 # =======================
 
-DB_PATH = os.getenv("DUCKDB_PATH", str(Path(__file__).parents[1] / "data_warehouse/job_ads.duckdb"))
+# queries read the newest snapshot the pipeline published, from its local copy
+# once there is one (query_db_path in connect_data_warehouse.py), looked up
+# again on every rerun of the script
 
 # =======================
 #   Streamlit setup
@@ -36,19 +38,19 @@ pages = {
 # =======================
 
 @st.cache_data
-def load_occupation_fields():
-    """Fetch available occupation fields from DuckDB."""
+def load_occupation_fields(db_path):
+    """Fetch available occupation fields from DuckDB; cached per snapshot."""
     query = f"""
         SELECT occupation_field
         FROM {MART_FOR_OCCUPATION_FIELDS}
         GROUP BY 1
         ORDER BY 1 DESC;
     """
-    with duckdb.connect(DB_PATH, read_only=True) as conn:
+    with duckdb.connect(db_path, read_only=True) as conn:
         results = conn.execute(query).fetchall()
     return [item for (item,) in results]
 
-available_occupation_fields = load_occupation_fields()
+available_occupation_fields = load_occupation_fields(str(query_db_path()))
 
 # =======================
 #   Sidebar filter
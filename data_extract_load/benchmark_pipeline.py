@@ -0,0 +1,181 @@
+#========================================#
+#                                        #
+#    Benchmarks the job ads pipeline     #
+#    offline against the stand-in API,   #
+#    stage by stage                      #
+#                                        #
+#========================================#
+
+# python benchmark_pipeline.py                       # 1k, 100k and 1M ads
+# python benchmark_pipeline.py --ads 1000 --use-arrow --latency-ms 30 --output bench.json
+#
+# For every size a fresh stand-in (jobtech_standin.py) is started in its own
+# process and a fresh dlt pipeline loads it into a throwaway duckdb file. Each
+# of extract, normalize and load is timed on its own and reports ads/s, bytes/s
+# and the peak RSS of this process while it ran. Extract bytes are the http
+# bodies received, normalize and load bytes the load package files.
+
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+import orjson
+import psutil
+
+# no telemetry calls from a benchmark, they may hang without network
+os.environ.setdefault("RUNTIME__DLTHUB_TELEMETRY", "false")
+
+import dlt
+
+from jobtech_standin import DEFAULT_PORT
+from load_job_ads import jobads_source
+
+
+STANDIN = Path(__file__).with_name("jobtech_standin.py")
+RESOURCE_CONFIG = "SOURCES__LOAD_JOB_ADS__JOBADS_RESOURCE__"
+
+
+class PeakRss:
+    """Samples the RSS of this process in a background thread while in the with block."""
+
+    def __init__(self, interval=0.05):
+        self._interval = interval
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self.peak = 0
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._process.memory_info().rss)
+            self._stop.wait(self._interval)
+
+    def __enter__(self):
+        self.peak = self._process.memory_info().rss
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._process.memory_info().rss)
+
+
+def _file_bytes(info):
+    # bytes of the files a stage wrote, from dlt's per-job writer metrics
+    return sum(
+        job.file_size
+        for load_metrics in info.metrics.values()
+        for step in load_metrics
+        for job in step["job_metrics"].values()
+    )
+
+
+def _stats(port):
+    with urllib.request.urlopen(f"http://localhost:{port}/stats") as response:
+        return orjson.loads(response.read())
+
+
+def _start_standin(n_ads, port, latency_ms, error_rate):
+    standin = subprocess.Popen([
+        sys.executable, str(STANDIN), "serve",
+        "--ads", str(n_ads), "--port", str(port),
+        "--latency-ms", str(latency_ms), "--error-rate", str(error_rate),
+    ])
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("localhost", port), timeout=1):
+                return standin
+        except OSError:
+            time.sleep(0.1)
+    standin.kill()
+    raise RuntimeError(f"stand-in did not start on port {port}")
+
+
+def _stage(name, n_ads, run):
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        info = run()
+        seconds = time.perf_counter() - started
+    return info, {
+        "stage": name,
+        "seconds": round(seconds, 3),
+        "ads_per_second": round(n_ads / seconds, 1),
+        "peak_rss_mb": round(rss.peak / 2**20, 1),
+    }
+
+
+def benchmark(n_ads, use_arrow=False, max_concurrency=10, latency_ms=0.0, error_rate=0.0, port=DEFAULT_PORT):
+    """Run extract, normalize and load for `n_ads` stand-in ads; returns one report row per stage."""
+    os.environ[RESOURCE_CONFIG + "SEARCH_URL"] = f"http://localhost:{port}"
+    os.environ[RESOURCE_CONFIG + "TAXONOMY_URL"] = f"http://localhost:{port}"
+    os.environ[RESOURCE_CONFIG + "MAX_CONCURRENCY"] = str(max_concurrency)
+    os.environ[RESOURCE_CONFIG + "REQUESTS_PER_SECOND"] = "0"  # no client side rate limit
+
+    standin = _start_standin(n_ads, port, latency_ms, error_rate)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            pipeline = dlt.pipeline(
+                pipeline_name="benchmark",
+                pipelines_dir=workdir,
+                destination=dlt.destinations.duckdb(os.path.join(workdir, "benchmark.duckdb")),
+                dataset_name="staging",
+            )
+            source = jobads_source(occupation_fields=["all"], use_arrow=use_arrow)
+
+            _, extract = _stage("extract", n_ads, lambda: pipeline.extract(source))
+            extract["bytes"] = _stats(port)["bytes"]
+            normalize_info, normalize = _stage("normalize", n_ads, pipeline.normalize)
+            normalize["bytes"] = _file_bytes(normalize_info)
+            _, load = _stage("load", n_ads, pipeline.load)
+            load["bytes"] = normalize["bytes"]  # load copies the normalized files into duckdb
+
+            loaded = pipeline.last_trace.last_normalize_info.row_counts.get("technical_field_job_ads", 0)
+            if loaded != n_ads:
+                raise RuntimeError(f"loaded {loaded} ads, expected {n_ads}")
+    finally:
+        standin.terminate()
+        standin.wait()
+
+    report = [extract, normalize, load]
+    for row in report:
+        row["ads"] = n_ads
+        row["use_arrow"] = use_arrow
+        row["bytes_per_second"] = round(row["bytes"] / row["seconds"], 1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ads", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--use-arrow", action="store_true")
+    parser.add_argument("--max-concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--output", help="also write the report as json to this file")
+    args = parser.parse_args()
+
+    report = []
+    for n_ads in args.ads:
+        report += benchmark(n_ads, args.use_arrow, args.max_concurrency, args.latency_ms, args.error_rate, args.port)
+
+    print(f"{'ads':>9} {'stage':<10} {'seconds':>9} {'ads/s':>11} {'MB/s':>8} {'peak RSS MB':>12}")
+    for row in report:
+        print(f"{row['ads']:>9} {row['stage']:<10} {row['seconds']:>9.2f} {row['ads_per_second']:>11.0f} "
+              f"{row['bytes_per_second'] / 2**20:>8.1f} {row['peak_rss_mb']:>12.1f}")
+    if args.output:
+        Path(args.output).write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#========================================#
+#                                        #
+#    Columns kept from each job ad and   #
+#    their explicit Arrow schema (same   #
+#    names as dlt's normalizer produces) #
+#                                        #
+#========================================#
+
+
+import hashlib
+import re
+import sys
+from pathlib import Path
+
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+SRC_MODELS_DIR = Path(__file__).parents[1] / "data_transformation" / "models" / "src"
+
+# The projection: every column the src models read, nothing else.
+# Check it with `python job_ad_schema.py` after changing a src model.
+# (column, path in the ad json, arrow type)
+JOB_AD_COLUMNS = [
+    ("id", ("id",), pa.string()),
+    ("removed", ("removed",), pa.bool_()),
+    ("removed_date", ("removed_date",), pa.timestamp("us", tz="UTC")),
+    ("headline", ("headline",), pa.string()),
+    ("number_of_vacancies", ("number_of_vacancies",), pa.int64()),
+    ("relevance", ("relevance",), pa.float64()),
+    ("application_deadline", ("application_deadline",), pa.timestamp("us", tz="UTC")),
+    ("publication_date", ("publication_date",), pa.timestamp("us", tz="UTC")),
+    ("last_publication_date", ("last_publication_date",), pa.timestamp("us", tz="UTC")),
+    ("experience_required", ("experience_required",), pa.bool_()),
+    ("driving_license_required", ("driving_license_required",), pa.bool_()),
+    ("access_to_own_car", ("access_to_own_car",), pa.bool_()),
+    ("description__text", ("description", "text"), pa.string()),
+    ("description__text_formatted", ("description", "text_formatted"), pa.string()),
+    ("employment_type__label", ("employment_type", "label"), pa.string()),
+    ("duration__label", ("duration", "label"), pa.string()),
+    ("salary_type__label", ("salary_type", "label"), pa.string()),
+    ("scope_of_work__min", ("scope_of_work", "min"), pa.int64()),
+    ("scope_of_work__max", ("scope_of_work", "max"), pa.int64()),
+    ("employer__name", ("employer", "name"), pa.string()),
+    ("employer__workplace", ("employer", "workplace"), pa.string()),
+    ("employer__organization_number", ("employer", "organization_number"), pa.string()),
+    ("workplace_address__street_address", ("workplace_address", "street_address"), pa.string()),
+    ("workplace_address__postcode", ("workplace_address", "postcode"), pa.string()),
+    ("workplace_address__city", ("workplace_address", "city"), pa.string()),
+    ("workplace_address__country", ("workplace_address", "country"), pa.string()),
+    ("workplace_address__country_code", ("workplace_address", "country_code"), pa.string()),
+    ("workplace_address__region", ("workplace_address", "region"), pa.string()),
+    ("workplace_address__region_code", ("workplace_address", "region_code"), pa.string()),
+    ("workplace_address__municipality", ("workplace_address", "municipality"), pa.string()),
+    ("workplace_address__municipality_code", ("workplace_address", "municipality_code"), pa.string()),
+    # the api sends coordinates as a [longitude, latitude] list
+    ("workplace_longitude", ("workplace_address", "coordinates", 0), pa.float64()),
+    ("workplace_latitude", ("workplace_address", "coordinates", 1), pa.float64()),
+    ("occupation__label", ("occupation", "label"), pa.string()),
+    ("occupation_group__label", ("occupation_group", "label"), pa.string()),
+    ("occupation_field__label", ("occupation_field", "label"), pa.string()),
+]
+
+JOB_AD_ARROW_SCHEMA = pa.schema([pa.field(name, arrow_type) for name, _, arrow_type in JOB_AD_COLUMNS])
+
+
+def _lookup(ad, path):
+    for key in path:
+        if ad is None:
+            return None
+        if isinstance(key, int):
+            ad = ad[key] if key < len(ad) else None
+        else:
+            ad = ad.get(key)
+    return ad
+
+
+def project(ad):
+    """Keep only the JOB_AD_COLUMNS of an ad, nested so that dlt's normalizer
+    produces exactly those column names (employer__name from employer.name)."""
+    projected = {}
+    for name, path, _ in JOB_AD_COLUMNS:
+        value = _lookup(ad, path)
+        if value is None:
+            continue
+        *parents, leaf = name.split("__")
+        target = projected
+        for key in parents:
+            target = target.setdefault(key, {})
+        target[leaf] = value
+    return projected
+
+
+def content_hash(ad):
+    """Short hash of the projected ad: equal for ads that would load the same row,
+    whatever the api changed in fields that are not projected or in key order."""
+    return hashlib.blake2b(orjson.dumps(project(ad), option=orjson.OPT_SORT_KEYS), digest_size=8).hexdigest()
+
+
+def _column(values, arrow_type):
+    if pa.types.is_timestamp(arrow_type):
+        # the API sends naive ISO strings, dlt's normalizer reads them as UTC
+        naive = pa.array(values, pa.string()).cast(pa.timestamp(arrow_type.unit))
+        return pc.assume_timezone(naive, arrow_type.tz)
+    return pa.array(values, arrow_type)
+
+
+def to_arrow(ads):
+    """Build one Arrow table for a page of ads."""
+    columns = [_column([_lookup(ad, path) for ad in ads], arrow_type) for _, path, arrow_type in JOB_AD_COLUMNS]
+    return pa.Table.from_arrays(columns, schema=JOB_AD_ARROW_SCHEMA)
+
+
+# select-list entries like `employer__name as employer_name,`
+_SELECTED_COLUMN = re.compile(r"^\s*(\w+)(?:\s+as\s+\w+)?\s*,?\s*(?:--.*)?$", re.IGNORECASE)
+_SQL_KEYWORDS = {"select", "with", "from", "where", "group", "order"}
+
+
+def columns_read_by_src_model(sql_file):
+    """Staging columns selected by one src model (dlt's own _dlt_* columns excluded)."""
+    columns = set()
+    for line in Path(sql_file).read_text().splitlines():
+        match = _SELECTED_COLUMN.match(line)
+        if match and match.group(1).lower() not in _SQL_KEYWORDS and not match.group(1).startswith("_dlt"):
+            columns.add(match.group(1))
+    return columns
+
+
+def columns_read_by_src_models(models_dir=SRC_MODELS_DIR):
+    """Staging columns selected by the src models."""
+    return set().union(*(columns_read_by_src_model(sql_file) for sql_file in sorted(models_dir.glob("*.sql"))))
+
+
+def missing_from_projection(models_dir=SRC_MODELS_DIR):
+    projected = {name for name, _, _ in JOB_AD_COLUMNS}
+    return sorted(columns_read_by_src_models(models_dir) - projected)
+
+
+if __name__ == "__main__":
+    missing = missing_from_projection()
+    if missing:
+        sys.exit(f"src models read columns that are not projected: {', '.join(missing)}")
+    print("projection covers every column read by the src models")
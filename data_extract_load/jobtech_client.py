@@ -0,0 +1,309 @@
+#========================================#
+#                                        #
+#    Async client for the JobTech APIs   #
+#    (paged /search and /stream feed)    #
+#    with retries and an on-disk cache   #
+#    for conditional requests            #
+#                                        #
+#========================================#
+
+
+import asyncio
+from datetime import datetime, timedelta
+import hashlib
+import logging
+import random
+import time
+from pathlib import Path
+
+import aiohttp
+import orjson
+
+
+SEARCH_URL = "https://jobsearch.api.jobtechdev.se"
+STREAM_URL = "https://jobstream.api.jobtechdev.se"
+TAXONOMY_URL = "https://taxonomy.api.jobtechdev.se"
+
+PAGE_SIZE = 100  # max "limit" accepted by /search
+MAX_OFFSET = 2000  # /search refuses offsets beyond this
+MIN_SPLIT_WINDOW = timedelta(minutes=1)  # publication windows are not split below this
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_BACKOFF = 60.0  # seconds, cap for one backoff sleep
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Spaces request starts so that at most `requests_per_second` are sent."""
+
+    def __init__(self, requests_per_second):
+        self._interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class ConditionalCache:
+    """Keeps the ETag / Last-Modified and body of each response on disk, keyed by
+    url and query, so the next request for the same page can be conditional."""
+
+    def __init__(self, directory):
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, url, query):
+        key = hashlib.sha1(orjson.dumps([url, sorted(query)])).hexdigest()
+        return self._directory / f"{key}.json", self._directory / f"{key}.body"
+
+    def validators(self, url, query):
+        """Request headers that make the next request for this page conditional."""
+        meta_path, body_path = self._paths(url, query)
+        if not (meta_path.exists() and body_path.exists()):
+            return {}
+        meta = orjson.loads(meta_path.read_bytes())
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def body(self, url, query):
+        return self._paths(url, query)[1].read_bytes()
+
+    def store(self, url, query, response, body):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not (etag or last_modified):
+            return  # nothing to revalidate with, don't spend disk on it
+        meta_path, body_path = self._paths(url, query)
+        # body first, so a crash in between never leaves validators without a body
+        _write_atomic(body_path, body)
+        _write_atomic(meta_path, orjson.dumps({"etag": etag, "last_modified": last_modified}))
+
+
+class JobTechClient:
+    """Fetches /search pages concurrently, bounded by a semaphore and a rate limiter.
+
+    Also reads the JobStream change feed, which returns every ad created, updated
+    or removed within a time window in one response.
+
+    All requests made through one client share the concurrency and rate limits
+    and one pooled keep-alive session. aiohttp asks for gzip/deflate bodies, and
+    br too when the Brotli package is installed.
+
+    429, 5xx, timeouts and dropped connections are retried up to `max_retries`
+    times with jittered exponential backoff, honouring Retry-After.
+
+    With a `cache_dir`, /search pages and the taxonomy are requested with
+    If-None-Match / If-Modified-Since and a 304 is answered from the cached body.
+    The cache is written as pages arrive, before anything is loaded, so a 304
+    only says the page is the one fetched last time, not that it was loaded:
+    its hits are always yielded and it is up to the caller to drop what it holds.
+    """
+
+    def __init__(self, max_concurrency=5, requests_per_second=5.0,
+                 search_url=SEARCH_URL, stream_url=STREAM_URL, taxonomy_url=TAXONOMY_URL,
+                 max_retries=5, backoff_seconds=1.0, request_timeout=30.0,
+                 cache_dir=None):
+        self.url_for_search = f"{search_url}/search"
+        self.url_for_stream = f"{stream_url}/stream"
+        self.url_for_taxonomy = f"{taxonomy_url}/v1/taxonomy/main/concepts"
+        self._max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_limiter = RateLimiter(requests_per_second)
+        self._max_retries = max_retries
+        self._backoff_seconds = backoff_seconds
+        self._timeout = aiohttp.ClientTimeout(total=request_timeout)
+        self._cache = ConditionalCache(cache_dir) if cache_dir else None
+        self._session = None
+        self.not_modified_pages = 0
+        self.truncated_queries = 0  # queries cut off at MAX_OFFSET, too short to split
+        self.retries = 0
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self._max_concurrency, keepalive_timeout=60, ttl_dns_cache=300)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self._timeout)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+
+    async def _get_json(self, url, query, conditional=False):
+        """GET url and decode the json body (the cached one on a 304)."""
+        headers = self._cache.validators(url, query) if conditional and self._cache else {}
+        for attempt in range(self._max_retries + 1):
+            retry_after = None
+            async with self._semaphore:
+                await self._rate_limiter.wait()
+                try:
+                    async with self._session.get(url, params=query, headers=headers) as response:
+                        if response.status == 304:
+                            self.not_modified_pages += 1
+                            return orjson.loads(self._cache.body(url, query))
+                        if response.status not in RETRY_STATUSES or attempt == self._max_retries:
+                            response.raise_for_status()  # check for http errors
+                            body = await response.read()
+                            if conditional and self._cache:
+                                self._cache.store(url, query, response, body)
+                            # decode straight from the body bytes, no intermediate str copy
+                            return orjson.loads(body)
+                        retry_after = _retry_after(response)
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    if attempt == self._max_retries:
+                        raise
+            # sleep outside the semaphore so other requests keep going meanwhile
+            self.retries += 1
+            await asyncio.sleep(retry_after if retry_after is not None else self._backoff(attempt))
+
+    def _backoff(self, attempt):
+        # "full jitter": spreads retries from concurrent requests over the window
+        return random.uniform(0, min(MAX_BACKOFF, self._backoff_seconds * 2 ** attempt))
+
+    async def get_page(self, params, offset):
+        query = [("offset", offset), ("limit", PAGE_SIZE), *_flatten(params)]
+        return await self._get_json(self.url_for_search, query, conditional=True)
+
+    async def iter_pages(self, params):
+        """Yield every page of hits for `params`, in completion order.
+
+        At most `max_concurrency` pages are requested ahead of the consumer, so
+        memory is bounded by a few pages however many ads match.
+
+        A query matching more ads than MAX_OFFSET lets through is split in two
+        publication windows, and those again, until every piece fits. Only a
+        window too short to split is cut off; it is logged and counted in
+        `truncated_queries`.
+        """
+        first_page = await self.get_page(params, offset=0)
+        total = first_page["total"]["value"]
+        if total > MAX_OFFSET + PAGE_SIZE:
+            halves = _split_window(params)
+            if halves:
+                async for hits in self.iter_sharded_pages(halves):
+                    yield hits
+                return
+            self.truncated_queries += 1
+            logger.warning(f"/search query {params} matches {total} ads, "
+                           f"only the first {MAX_OFFSET + PAGE_SIZE} can be read")
+            total = MAX_OFFSET + PAGE_SIZE
+        yield first_page["hits"]
+
+        offsets = iter(range(PAGE_SIZE, total, PAGE_SIZE))
+        pending = set()
+        try:
+            while True:
+                for offset in offsets:
+                    pending.add(asyncio.ensure_future(self.get_page(params, offset)))
+                    if len(pending) >= self._max_concurrency:
+                        break
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()["hits"]
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def iter_sharded_pages(self, shards):
+        """Walk several /search queries at once and yield their pages as they arrive.
+
+        Each shard (a params dict) is paged on its own, so every shard gets its
+        own MAX_OFFSET window; the shards compete for the shared limits.
+        """
+        pages = asyncio.Queue(maxsize=self._max_concurrency)
+        done = object()
+
+        async def walk(params):
+            try:
+                async for hits in self.iter_pages(params):
+                    await pages.put(hits)
+            except Exception as exc:
+                await pages.put(exc)  # fail the whole walk, not just this shard
+            else:
+                await pages.put(done)
+
+        walkers = [asyncio.ensure_future(walk(params)) for params in shards]
+        try:
+            remaining = len(walkers)
+            while remaining:
+                hits = await pages.get()
+                if hits is done:
+                    remaining -= 1
+                elif isinstance(hits, Exception):
+                    raise hits
+                else:
+                    yield hits
+        finally:
+            for walker in walkers:
+                walker.cancel()
+
+    async def get_occupation_fields(self):
+        """Concept ids of every occupation field in the JobTech taxonomy."""
+        concepts = await self._get_json(self.url_for_taxonomy, [("type", "occupation-field")], conditional=True)
+        return [concept["taxonomy/id"] for concept in concepts]
+
+    async def get_changes(self, occupation_fields, since, until):
+        """Return ads created, changed or removed (``removed: true``) in [since, until).
+
+        An empty occupation_fields list reads the changes for every field.
+        """
+        query = [
+            ("date", since),
+            ("updated-before-date", until),
+            *(("occupation-concept-id", field) for field in occupation_fields),
+        ]
+        changes = await self._get_json(self.url_for_stream, query)
+        return changes
+
+
+def _split_window(params):
+    """The query split in two at the middle of its publication window, or None
+    when the window is too short. An open end stays open: the split point is
+    taken from a year before the other end, or from tomorrow."""
+    published_after = params.get("published-after")
+    published_before = params.get("published-before")
+    after = datetime.fromisoformat(published_after) if published_after else None
+    before = datetime.fromisoformat(published_before) if published_before else None
+    if before is None:
+        # the api's times are local and naive, follow the given bound if it has a zone
+        now = datetime.now(after.tzinfo) if after is not None else datetime.now()
+        before_or_tomorrow = now.replace(microsecond=0) + timedelta(days=1)
+    else:
+        before_or_tomorrow = before
+    start = after if after is not None else before_or_tomorrow - timedelta(days=365)
+    if before_or_tomorrow - start < 2 * MIN_SPLIT_WINDOW:
+        return None
+    middle = (start + (before_or_tomorrow - start) / 2).replace(microsecond=0).isoformat()
+    return [{**params, "published-before": middle}, {**params, "published-after": middle}]
+
+
+def _flatten(params):
+    # aiohttp wants a flat list of pairs for repeated keys like occupation-field
+    for key, value in params.items():
+        values = value if isinstance(value, list) else [value]
+        for v in values:
+            yield key, v
+
+
+def _retry_after(response):
+    # only the delta-seconds form; an http-date falls back to the normal backoff
+    try:
+        return min(MAX_BACKOFF, float(response.headers["Retry-After"]))
+    except (KeyError, ValueError):
+        return None
+
+
+def _write_atomic(path, data):
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
@@ -0,0 +1,372 @@
+#========================================#
+#                                        #
+#    Local stand-in for the JobTech      #
+#    /search, /stream and taxonomy APIs, #
+#    serving recorded or synthetic ads   #
+#                                        #
+#========================================#
+
+# serve 100 000 synthetic ads on port 8765:
+#   python jobtech_standin.py serve --ads 100000
+# record the technical occupation fields from the real API, then replay them:
+#   python jobtech_standin.py record ads.jsonl
+#   python jobtech_standin.py serve --replay ads.jsonl --latency-ms 50 --error-rate 0.02
+# and point the pipeline at it with
+#   SOURCES__LOAD_JOB_ADS__JOBADS_RESOURCE__SEARCH_URL=http://localhost:8765
+#   SOURCES__LOAD_JOB_ADS__JOBADS_RESOURCE__STREAM_URL=http://localhost:8765
+#   SOURCES__LOAD_JOB_ADS__JOBADS_RESOURCE__TAXONOMY_URL=http://localhost:8765
+# the served ads only change when asked to, e.g. edit 20 and remove 5 random ads:
+#   curl -X POST 'http://localhost:8765/changes?edit=20&remove=5'
+# after which /search reflects them and /stream reports them
+
+
+import argparse
+import asyncio
+import bisect
+import math
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+import orjson
+from aiohttp import web
+
+from jobtech_client import MAX_OFFSET, PAGE_SIZE, JobTechClient
+from load_job_ads import TECHNICAL_OCCUPATION_FIELDS
+
+
+DEFAULT_PORT = 8765
+
+_OCCUPATIONS = [
+    ("Mjukvaruutvecklare", "Mjukvaru- och systemutvecklare m.fl."),
+    ("Systemarkitekt", "Mjukvaru- och systemutvecklare m.fl."),
+    ("Drifttekniker", "Drifttekniker, IT"),
+    ("Elektriker", "Installations- och serviceelektriker"),
+    ("Civilingenjör, bygg", "Civilingenjörsyrken inom bygg och anläggning"),
+]
+_MUNICIPALITIES = [
+    ("Stockholm", "0180", "Stockholms län", "01", 18.07, 59.33),
+    ("Göteborg", "1480", "Västra Götalands län", "14", 11.97, 57.71),
+    ("Malmö", "1280", "Skåne län", "12", 13.00, 55.60),
+    ("Uppsala", "0380", "Uppsala län", "03", 17.64, 59.86),
+    ("Linköping", "0580", "Östergötlands län", "05", 15.62, 58.41),
+]
+_DESCRIPTION = "Vi söker en engagerad kollega till vårt team. " * 40  # ~2 kB, like a real ad
+_FIRST_PUBLISHED = datetime(2025, 1, 1)
+_MINUTES_PER_YEAR = 60 * 24 * 365
+
+
+class SyntheticAds:
+    """`n_ads` generated ads spread over enough occupation fields that no field
+    needs an offset beyond MAX_OFFSET, like the real API's limit per query.
+
+    Ads are addressed by their index; keys() lists the indexes of a field,
+    optionally only those published in [published_after, published_before).
+    """
+
+    def __init__(self, n_ads, seed=0):
+        self.n_ads = n_ads
+        self.seed = seed
+        n_fields = max(len(TECHNICAL_OCCUPATION_FIELDS), math.ceil(n_ads / (MAX_OFFSET + PAGE_SIZE)))
+        extra_fields = [f"synthetic_{i:04d}" for i in range(n_fields - len(TECHNICAL_OCCUPATION_FIELDS))]
+        self.fields = TECHNICAL_OCCUPATION_FIELDS + extra_fields
+        self.version = f"synthetic-{n_ads}-{seed}"
+        self._by_published = {}  # field -> (sorted publication minutes, indexes)
+
+    def keys(self, field, published_after=None, published_before=None):
+        if field is None:
+            indexes = range(self.n_ads)
+        else:
+            indexes = range(self.fields.index(field), self.n_ads, len(self.fields))
+        if published_after is None and published_before is None:
+            return indexes
+        if field not in self._by_published:
+            ordered = sorted(indexes, key=self._minute)
+            self._by_published[field] = ([self._minute(i) for i in ordered], ordered)
+        minutes, ordered = self._by_published[field]
+        start = 0 if published_after is None else bisect.bisect_left(minutes, _minutes_since_first(published_after))
+        end = len(minutes) if published_before is None else bisect.bisect_left(minutes, _minutes_since_first(published_before))
+        return ordered[start:end]
+
+    def key_of(self, ad_id):
+        i = int(ad_id) - 30_000_000
+        return i if 0 <= i < self.n_ads else None
+
+    def ad_id(self, i):
+        return str(30_000_000 + i)
+
+    def _minute(self, i):
+        # cheap and spread over the year, so windows can be indexed without building the ads
+        return (i * 2_654_435_761 + self.seed * 40_503) % _MINUTES_PER_YEAR
+
+    def ad(self, i):
+        rng = random.Random(self.seed * 1_000_003 + i)
+        field = self.fields[i % len(self.fields)]
+        occupation, group = rng.choice(_OCCUPATIONS)
+        municipality, municipality_code, region, region_code, lon, lat = rng.choice(_MUNICIPALITIES)
+        published = _FIRST_PUBLISHED + timedelta(minutes=self._minute(i))
+        return {
+            "id": self.ad_id(i),
+            "headline": f"{occupation} till team {i % 97}",
+            "number_of_vacancies": rng.randint(1, 3),
+            "relevance": round(rng.random(), 4),
+            "application_deadline": (published + timedelta(days=rng.randint(14, 60))).isoformat(),
+            "publication_date": published.isoformat(),
+            "last_publication_date": (published + timedelta(days=60)).isoformat(),
+            "experience_required": rng.random() < 0.6,
+            "driving_license_required": rng.random() < 0.2,
+            "access_to_own_car": rng.random() < 0.1,
+            "removed": False,
+            "description": {"text": _DESCRIPTION, "text_formatted": f"<p>{_DESCRIPTION}</p>"},
+            "employment_type": {"label": "Vanlig anställning"},
+            "duration": {"label": "Tills vidare"},
+            "salary_type": {"label": "Fast månads- vecko- eller timlön"},
+            "scope_of_work": {"min": 100, "max": 100},
+            "employer": {
+                "name": f"Företag {i % 1000} AB",
+                "workplace": f"Arbetsplats {i % 1000}",
+                "organization_number": f"556{i % 1000:07d}",
+            },
+            "workplace_address": {
+                "street_address": f"Storgatan {i % 120 + 1}",
+                "postcode": f"{10000 + i % 90000}",
+                "city": municipality,
+                "country": "Sverige",
+                "country_code": "199",
+                "region": region,
+                "region_code": region_code,
+                "municipality": municipality,
+                "municipality_code": municipality_code,
+                "coordinates": [lon, lat],
+            },
+            "occupation": {"label": occupation},
+            "occupation_group": {"label": group},
+            "occupation_field": {"label": "Data/IT", "concept_id": field},
+        }
+
+
+class RecordedAds:
+    """Ads read from a json-lines file written by `record`, paged per occupation field.
+
+    Ads are addressed by their line number in the file.
+    """
+
+    def __init__(self, path):
+        self.ads = []
+        self.by_field = {None: []}
+        with open(path, "rb") as f:
+            for line in f:
+                ad = orjson.loads(line)
+                field = (ad.get("occupation_field") or {}).get("concept_id")
+                self.by_field[None].append(len(self.ads))
+                self.by_field.setdefault(field, []).append(len(self.ads))
+                self.ads.append(ad)
+        self.fields = [field for field in self.by_field if field is not None]
+        self.version = f"recorded-{os.path.getmtime(path):.0f}"
+        self._keys_by_id = {ad["id"]: i for i, ad in enumerate(self.ads)}
+
+    def keys(self, field, published_after=None, published_before=None):
+        keys = self.by_field.get(field, [])
+        if published_after is None and published_before is None:
+            return keys
+        # the api's naive local times compare as strings
+        return [
+            i for i in keys
+            if (published_after is None or self.ads[i]["publication_date"] >= published_after)
+            and (published_before is None or self.ads[i]["publication_date"] < published_before)
+        ]
+
+    def key_of(self, ad_id):
+        return self._keys_by_id.get(ad_id)
+
+    def ad_id(self, i):
+        return self.ads[i]["id"]
+
+    def ad(self, i):
+        return self.ads[i]
+
+
+class Changes:
+    """Edits and removals made to the served ads since the stand-in started,
+    each stamped with the (utc, naive) time it was made, like the JobStream feed."""
+
+    def __init__(self, ads, seed=0):
+        self.ads = ads
+        self.generation = 0  # part of every ETag, so pages revalidate after a change
+        self.edits = {}  # ad id -> number of times edited
+        self.removed = {}  # ad id -> removed_date
+        self.events = []  # (timestamp, ad id), in the order they were made
+        self._rng = random.Random(seed)
+
+    def make(self, n_edits, n_removals):
+        """Edit and remove that many random live ads; returns their ids."""
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+        all_keys = self.ads.keys(None)
+        live = len(all_keys) - len(self.removed)
+        touched = {}
+        while len(touched) < min(n_edits + n_removals, live):
+            ad_id = self.ads.ad_id(self._rng.choice(all_keys))
+            if ad_id not in self.removed and ad_id not in touched:
+                touched[ad_id] = "edited" if len(touched) < n_edits else "removed"
+        for ad_id, change in touched.items():
+            if change == "edited":
+                self.edits[ad_id] = self.edits.get(ad_id, 0) + 1
+            else:
+                self.removed[ad_id] = now
+            self.events.append((now, ad_id))
+        self.generation += 1
+        return touched
+
+    def live_keys(self, keys):
+        if not self.removed:
+            return keys
+        return [key for key in keys if self.ads.ad_id(key) not in self.removed]
+
+    def ad(self, key):
+        ad = self.ads.ad(key)
+        edits = self.edits.get(ad["id"])
+        if edits:
+            ad = {**ad, "headline": f"{ad['headline']} ({edits})",
+                  "number_of_vacancies": (ad.get("number_of_vacancies") or 0) + edits}
+        return ad
+
+    def since(self, since, until, occupation_fields):
+        """The current state of every ad changed in [since, until), removed ones
+        as {"id", "removed": true, "removed_date"}."""
+        changed = dict.fromkeys(ad_id for at, ad_id in self.events if since <= at < until)
+        feed = []
+        for ad_id in changed:
+            ad = self.ad(self.ads.key_of(ad_id))
+            if occupation_fields and (ad.get("occupation_field") or {}).get("concept_id") not in occupation_fields:
+                continue
+            if ad_id in self.removed:
+                ad = {"id": ad_id, "removed": True, "removed_date": self.removed[ad_id]}
+            feed.append(ad)
+        return feed
+
+
+def _minutes_since_first(timestamp):
+    published = datetime.fromisoformat(timestamp).replace(tzinfo=None)
+    return math.ceil((published - _FIRST_PUBLISHED).total_seconds() / 60)
+
+
+def make_app(ads, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0):
+    """aiohttp app answering /search with offset/limit paging over `ads`, filtered
+    by occupation-field and published-after/published-before, and /stream with
+    the ads changed through POST /changes in a date/updated-before-date window.
+
+    Every request is delayed by latency_ms (+ up to jitter_ms), and a share of
+    error_rate /search requests fail with 429, 500 or 503. Pages carry an ETag
+    so conditional requests get 304. /stats reports what has been served.
+    """
+    rng = random.Random(seed)
+    changes = Changes(ads, seed)
+    stats = {"requests": 0, "errors": 0, "not_modified": 0, "bytes": 0, "edited": 0, "removed": 0}
+
+    async def delay():
+        if latency_ms or jitter_ms:
+            await asyncio.sleep((latency_ms + rng.uniform(0, jitter_ms)) / 1000)
+
+    async def search(request):
+        await delay()
+        stats["requests"] += 1
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            return web.json_response({"message": "injected error"}, status=rng.choice([429, 500, 503]))
+
+        offset = int(request.query.get("offset", 0))
+        limit = int(request.query.get("limit", 10))
+        if offset > MAX_OFFSET or limit > PAGE_SIZE:
+            return web.json_response({"message": "offset or limit out of range"}, status=400)
+        fields = request.query.getall("occupation-field", [])
+        if len(fields) > 1:
+            return web.json_response({"message": "the stand-in pages one occupation field at a time"}, status=400)
+        field = fields[0] if fields else None
+        published_after = request.query.get("published-after")
+        published_before = request.query.get("published-before")
+
+        etag = f'"{ads.version}-{changes.generation}-{field}-{published_after}-{published_before}-{offset}-{limit}"'
+        if request.headers.get("If-None-Match") == etag:
+            stats["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+
+        keys = changes.live_keys(ads.keys(field, published_after, published_before))
+        hits = [changes.ad(key) for key in keys[offset:offset + limit]]
+        body = orjson.dumps({"total": {"value": len(keys)}, "hits": hits})
+        stats["bytes"] += len(body)
+        return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+    async def stream(request):
+        await delay()
+        stats["requests"] += 1
+        until = request.query.get("updated-before-date", "9999")
+        feed = changes.since(request.query["date"], until, request.query.getall("occupation-concept-id", []))
+        body = orjson.dumps(feed)
+        stats["bytes"] += len(body)
+        return web.Response(body=body, content_type="application/json")
+
+    async def make_changes(request):
+        touched = changes.make(int(request.query.get("edit", 0)), int(request.query.get("remove", 0)))
+        for change in touched.values():
+            stats[change] += 1
+        return web.json_response(touched)
+
+    async def taxonomy(request):
+        await delay()
+        return web.json_response([{"taxonomy/id": field} for field in ads.fields])
+
+    async def get_stats(request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_get("/search", search)
+    app.router.add_get("/stream", stream)
+    app.router.add_post("/changes", make_changes)
+    app.router.add_get("/v1/taxonomy/main/concepts", taxonomy)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+async def record(path, occupation_fields):
+    """Save every ad of `occupation_fields` from the real /search API as json lines."""
+    written = 0
+    async with JobTechClient() as client:
+        with open(path, "wb") as f:
+            shards = [{"occupation-field": field} for field in occupation_fields]
+            async for hits in client.iter_sharded_pages(shards):
+                for ad in hits:
+                    f.write(orjson.dumps(ad) + b"\n")
+                written += len(hits)
+    print(f"recorded {written} ads to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="serve synthetic or recorded ads")
+    serve.add_argument("--ads", type=int, default=1000, help="number of synthetic ads")
+    serve.add_argument("--replay", help="json-lines file written by `record`, instead of synthetic ads")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--latency-ms", type=float, default=0.0)
+    serve.add_argument("--jitter-ms", type=float, default=0.0)
+    serve.add_argument("--error-rate", type=float, default=0.0)
+    serve.add_argument("--seed", type=int, default=0)
+
+    rec = commands.add_parser("record", help="record ads from the real API")
+    rec.add_argument("path")
+    rec.add_argument("--occupation-field", action="append", dest="occupation_fields",
+                     help="concept id, repeatable (default: the technical fields)")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        asyncio.run(record(args.path, args.occupation_fields or TECHNICAL_OCCUPATION_FIELDS))
+        return
+
+    ads = RecordedAds(args.replay) if args.replay else SyntheticAds(args.ads, args.seed)
+    app = make_app(ads, args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    web.run_app(app, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
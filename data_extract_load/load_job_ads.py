@@ -1,45 +1,282 @@
 #========================================#
 #                                        #
-#    This script loads job ads for       #
-#    "Yrken med teknisk inriktning"      #
+#    This script loads job ads for a     #
+#    configurable list of occupation     #
+#    fields, by default "Yrken med       #
+#    teknisk inriktning"                 #
 #                                        #
 #========================================#
 
 
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
 import dlt
-import requests
-import json
+import pyarrow as pa
+from dlt.common import logger
+
+from job_ad_schema import content_hash, project, to_arrow
+from jobtech_client import PAGE_SIZE, SEARCH_URL, STREAM_URL, TAXONOMY_URL, JobTechClient
 
 
 # truncate staging_staging schema produced by dlt together with dagster by default
 dlt.config["load.truncate_staging_dataset"] = True
+# arrow tables skip the normalizer, let it still stamp rows with _dlt_load_id and
+# _dlt_id, so a table first loaded from json rows (_dlt_id not null) takes them
+dlt.config["normalize.parquet_normalizer.add_dlt_load_id"] = True
+dlt.config["normalize.parquet_normalizer.add_dlt_id"] = True
 
-params = {"limit": 100, "occupation-field": [
-        "6Hq3_tKo_V57",
-        "RPTn_bxG_ExZ",
-        "NYW6_mP6_vwf",
-        "ScKy_FHB_7wT"
-    ]}
+# occupation-field concept ids for "Yrken med teknisk inriktning"
+TECHNICAL_OCCUPATION_FIELDS = [
+    "6Hq3_tKo_V57",
+    "RPTn_bxG_ExZ",
+    "NYW6_mP6_vwf",
+    "ScKy_FHB_7wT",
+]
+ALL_OCCUPATION_FIELDS = "all"
+JOB_ADS_TABLE = "technical_field_job_ads"
 
-def _get_ads(url_for_search, params):
-    response = requests.get(url_for_search, params=params)
-    response.raise_for_status()  # check for http errors
-    return json.loads(response.content.decode("utf8"))
 
-
-@dlt.resource(table_name = "technical_field_job_ads",
+@dlt.resource(table_name = JOB_ADS_TABLE,
               write_disposition="replace",
               )
-def jobads_resource(params):
+async def jobads_resource(occupation_fields,
+                          incremental: bool = False,
+                          use_arrow: bool = False,
+                          use_change_feed: bool = True,
+                          published_after: Optional[str] = None,
+                          published_before: Optional[str] = None,
+                          max_concurrency: int = 5,
+                          requests_per_second: float = 5.0,
+                          max_retries: int = 5,
+                          request_timeout: float = 30.0,
+                          http_cache_dir: Optional[str] = None,
+                          search_url: str = SEARCH_URL,
+                          stream_url: str = STREAM_URL,
+                          taxonomy_url: str = TAXONOMY_URL):
+    """Walk every /search page with offset/limit paging; pages are fetched concurrently
+    and handed to dlt as page-sized lists, projected to the columns the src models read.
+
+    Each occupation field is its own shard (split by publication window when it
+    matches more ads than /search pages through), paged in parallel with the
+    others under one shared concurrency and rate limit. ["all"] shards over every
+    occupation field in the JobTech taxonomy.
+
+    In incremental mode only the ads created, changed or removed since the cursor
+    kept in the resource state are read from the JobStream feed. The first
+    incremental run has no cursor yet and walks /search like a full load.
+
+    Every row carries a content_hash of its projected columns. Incremental and
+    windowed runs read the hashes of the live staging rows they may touch (the
+    window's, the feed's ids, or all of them) back from the destination and only
+    hand new or changed ads to dlt, so an ad the feed (or /search) returns again
+    unchanged is not written to staging twice, while an ad whose load failed is
+    not mistaken for a loaded one. With use_change_feed=False every incremental
+    run walks /search and relies on the hashes alone. Counts of written, skipped
+    and removed ads, and of /search queries still cut off at MAX_OFFSET, are kept
+    in the state as last_run_stats, with a fingerprint of the content written
+    (equal for runs writing the same rows).
+
+    With a published_after/published_before window (ISO datetimes, as Dagster's
+    daily partitions pass them) only ads published in that window are read from
+    /search, one shard per occupation field and day, and merged into the table.
+    /search only returns live ads, so these runs also take their removals from
+    two places: the change feed since the cursor (the first windowed run only
+    starts the cursor), applied to ads of any publication date, and the window
+    itself, where ads still live in staging that /search no longer returned are
+    tombstoned, as long as no shard was cut off at MAX_OFFSET.
+
+    With use_arrow each page is turned into an Arrow table with an explicit schema,
+    which dlt writes straight to parquet without running its normalizer.
+
+    Pages are requested conditionally against an on-disk cache, by default in the
+    pipeline's working directory. A page answered with 304 Not Modified is read
+    back from the cache like any other; the cache is written before the load, so
+    a 304 does not mean its ads reached staging.
+
+    use_change_feed, max_concurrency, requests_per_second, max_retries, request_timeout,
+    http_cache_dir and the api base urls can be set through dlt config, e.g.
+    SOURCES__LOAD_JOB_ADS__JOBADS_RESOURCE__MAX_CONCURRENCY=10 or
+    SOURCES__LOAD_JOB_ADS__JOBADS_RESOURCE__SEARCH_URL=http://localhost:8765
+    to run against the stand-in in jobtech_standin.py.
+    """
+
+    state = dlt.current.resource_state()
+    run_started = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+    all_fields = ALL_OCCUPATION_FIELDS in occupation_fields
+    windowed = published_after is not None or published_before is not None
+    merge = incremental or windowed
+    state.pop("content_hashes", None)  # the hash index used to live in the state
+    stats = {"written": 0, "skipped": 0, "removed": 0, "fingerprint": 0}
+
+    if http_cache_dir is None:
+        http_cache_dir = os.path.join(dlt.current.pipeline().working_dir, "http_cache")
+    client = JobTechClient(max_concurrency, requests_per_second,
+                           search_url=search_url, stream_url=stream_url, taxonomy_url=taxonomy_url,
+                           max_retries=max_retries, request_timeout=request_timeout,
+                           cache_dir=http_cache_dir)
+
+    read_feed = merge and use_change_feed and "last_updated" in state
+    seen = set()  # ids /search or the feed returned, live or removed
+    async with client:
+        if windowed or not read_feed:
+            if all_fields:
+                occupation_fields = await client.get_occupation_fields()
+            # hashes are only safe to skip on when the table is merged into, not replaced
+            hashes = _loaded_hashes(*_publication_filter(published_after, published_before)) if merge else None
+            shards = [
+                {"occupation-field": field, **window}
+                for field in occupation_fields
+                for window in _daily_windows(published_after, published_before)
+            ]
+            async for hits in client.iter_sharded_pages(shards):
+                for ad in hits:
+                    ad.setdefault("removed", False)
+                    seen.add(ad["id"])
+                ads, digests = _changed_ads(hits, hashes, stats)
+                if ads:  # empty for pages without changes
+                    yield _to_items(ads, digests, use_arrow)
 
-    url = "https://jobsearch.api.jobtechdev.se"
-    url_for_search = f"{url}/search"
+        if read_feed:
+            changes = await client.get_changes(
+                [] if all_fields else occupation_fields, state["last_updated"], run_started
+            )
+            # what /search just returned is newer than the feed's version of it
+            changes = [ad for ad in changes if ad["id"] not in seen]
+            seen.update(ad["id"] for ad in changes)
+            hashes = _loaded_hashes("id in (select unnest(%s))", [ad["id"] for ad in changes])
+            for start in range(0, len(changes), PAGE_SIZE):
+                ads, digests = _changed_ads(changes[start:start + PAGE_SIZE], hashes, stats)
+                if ads:
+                    yield _to_items(ads, digests, use_arrow)
 
-    for ad in _get_ads(url_for_search, params)["hits"]:
-        yield ad
+        if windowed and client.truncated_queries == 0:
+            # strictly inside the window: the api may draw its bounds the other way round
+            in_window = _loaded_hashes(*_publication_filter(published_after, published_before, exclusive=True))
+            gone = [{"id": ad_id, "removed": True} for ad_id in in_window if ad_id not in seen]
+            for start in range(0, len(gone), PAGE_SIZE):
+                ads, digests = _changed_ads(gone[start:start + PAGE_SIZE], None, stats)
+                yield _to_items(ads, digests, use_arrow)
+
+    # only move the cursor once the whole window has been read; windowed runs
+    # without the feed leave it to the incremental ones
+    if not windowed or use_change_feed:
+        state["last_updated"] = run_started
+    stats["fingerprint"] = f"{stats['fingerprint']:016x}"
+    stats["truncated_queries"] = client.truncated_queries
+    state["last_run_stats"] = stats
+    logger.info(f"job ads written: {stats['written']}, unchanged and skipped: {stats['skipped']}, "
+                f"removed: {stats['removed']}, /search queries cut off: {stats['truncated_queries']}")
+
+
+def _loaded_hashes(where="true", *args):
+    """content_hash by id of the live staging rows matching `where`; empty before
+    the first load, None for rows loaded before the column existed."""
+    pipeline = dlt.current.pipeline()
+    with pipeline.sql_client() as client:
+        columns = {row[0] for row in client.execute_sql(
+            "select column_name from information_schema.columns where table_schema = %s and table_name = %s",
+            client.dataset_name, JOB_ADS_TABLE,
+        )}
+        if not columns:
+            return {}
+        content_hash = "content_hash" if "content_hash" in columns else "null"
+        rows = client.execute_sql(
+            f"select id, {content_hash} from {client.make_qualified_table_name(JOB_ADS_TABLE)}"
+            f" where not coalesce(removed, false) and {where}",
+            *args,
+        )
+    return dict(rows)
+
+
+def _publication_filter(published_after, published_before, exclusive=False):
+    # staging holds the api's naive local times as utc, compare them the same way
+    conditions, args = ["true"], []
+    if published_after is not None:
+        conditions.append(f"publication_date {'>' if exclusive else '>='} %s::timestamptz")
+        args.append(f"{published_after}+00:00")
+    if published_before is not None:
+        conditions.append("publication_date < %s::timestamptz")
+        args.append(f"{published_before}+00:00")
+    return " and ".join(conditions), *args
+
+
+def _changed_ads(ads, hashes, stats):
+    """Tombstone removed ads and, when a hash index is given, drop unchanged ones.
+    Returns the ads to write and their content hashes; everything handed on is
+    also folded into the run's content fingerprint."""
+    changed, digests = [], []
+    for ad in ads:
+        if ad.get("removed"):
+            item = _tombstone(ad)
+            digest = content_hash(item)
+            if hashes is not None:
+                hashes.pop(ad["id"], None)
+            stats["removed"] += 1
+        else:
+            item = ad
+            digest = content_hash(ad)
+            if hashes is not None:
+                if hashes.get(ad["id"]) == digest:
+                    stats["skipped"] += 1
+                    continue
+                hashes[ad["id"]] = digest
+            stats["written"] += 1
+        # a sum does not depend on the order the concurrent pages arrive in
+        stats["fingerprint"] = (stats["fingerprint"] + int(digest, 16)) % 2**64
+        changed.append(item)
+        digests.append(digest)
+    return changed, digests
+
+
+def _daily_windows(published_after, published_before):
+    """Split a publication window into day-long /search filters, so every day gets
+    its own MAX_OFFSET and a multi-day backfill is fetched in parallel."""
+    if published_after is None or published_before is None:
+        # open ended (or no) window, a single filter
+        window = {"published-after": published_after, "published-before": published_before}
+        return [{key: value for key, value in window.items() if value is not None}]
+    start = datetime.fromisoformat(published_after)
+    end = datetime.fromisoformat(published_before)
+    windows = []
+    while start < end:
+        day_end = min(start + timedelta(days=1), end)
+        windows.append({"published-after": start.isoformat(), "published-before": day_end.isoformat()})
+        start = day_end
+    return windows
+
+
+def _to_items(ads, digests, use_arrow):
+    if use_arrow:
+        return to_arrow(ads).append_column("content_hash", pa.array(digests, pa.string()))
+    return [{**project(ad), "content_hash": digest} for ad, digest in zip(ads, digests)]
+
+
+def _tombstone(ad):
+    # removed ads only carry their id; keep the row, flagged, instead of deleting it
+    return {"id": ad["id"], "removed": True, "removed_date": ad.get("removed_date")}
 
 
 # dagster only works with dlt source, not dlt resource
 @dlt.source
-def jobads_source():
-    return jobads_resource(params)
\ No newline at end of file
+def jobads_source(occupation_fields: Optional[List[str]] = None,
+                  incremental: bool = False,
+                  use_arrow: bool = False,
+                  published_after: Optional[str] = None,
+                  published_before: Optional[str] = None):
+    """Set SOURCES__LOAD_JOB_ADS__OCCUPATION_FIELDS='["all"]' (or a JSON list of
+    concept ids) to choose the fields, SOURCES__LOAD_JOB_ADS__INCREMENTAL=true to
+    upsert daily changes instead of replacing the whole table, and
+    SOURCES__LOAD_JOB_ADS__USE_ARROW=true to load through parquet instead of
+    dlt's row-by-row normalizer.
+
+    published_after/published_before limit the load to ads published in that
+    window and merge them into the table; Dagster passes its partition window."""
+    resource = jobads_resource(occupation_fields or TECHNICAL_OCCUPATION_FIELDS,
+                               incremental=incremental, use_arrow=use_arrow,
+                               published_after=published_after, published_before=published_before)
+    if incremental or published_after or published_before:
+        resource.apply_hints(write_disposition="merge", primary_key="id")
+    return resource
@@ -0,0 +1,25 @@
+{% macro dim_natural_key(dim) -%}
+    {#- columns each dim's surrogate key is hashed from; src_job_ads has them under the
+        same names, so fct_job_ads computes its foreign keys without joining the dims -#}
+    {%- set natural_keys = {
+        'dim_auxilliary_attributes': ['access_to_own_car', 'driver_license', 'experience_required'],
+        'dim_employer': ['employer_name', 'employer_organization_number', 'employer_workplace'],
+        'dim_job_details': ['job_ad_id'],
+        'dim_location': ['location_country_code', 'location_municipality_code', 'location_region_code'],
+        'dim_occupation': ['occupation_label'],
+    } -%}
+    {{ return(natural_keys[dim]) }}
+{%- endmacro %}
+
+
+{% macro dim_key(dim) -%}
+    {{ integer_surrogate_key(dim_natural_key(dim)) }}
+{%- endmacro %}
+
+
+{% macro fct_dim_key(dim) -%}
+    {#- null when part of the natural key is, as the equality join to the dim used to give -#}
+    case when {{ dim_natural_key(dim) | join(' is not null and ') }} is not null
+        then {{ dim_key(dim) }}
+    end
+{%- endmacro %}
@@ -0,0 +1,27 @@
+{% macro fct_job_ads_change_consumers() -%}
+    {#- the aggregates maintained from fct_job_ads deltas, each with its own change log -#}
+    {{ return(['agg_occupation_deadline', 'agg_location_occupation']) }}
+{%- endmacro %}
+
+
+{% macro fct_job_ads_changes(fct_relation, consumer) -%}
+    {#- change log next to fct_job_ads: the previous version of every ad an incremental
+        build replaced or removed, until the consumer aggregate has applied it -#}
+    {{ return(fct_relation.incorporate(path={"identifier": fct_relation.identifier ~ "_changes__" ~ consumer})) }}
+{%- endmacro %}
+
+
+{% macro create_fct_job_ads_changes(fct_relation, consumer) -%}
+    {#- created by plain sql in hooks, so dbt's relation cache never knows about it;
+        both models that use it make sure it exists instead of looking it up -#}
+    create table if not exists {{ fct_job_ads_changes(fct_relation, consumer) }} (
+        job_ad_id varchar,
+        occupation_id ubigint,
+        employer_id ubigint,
+        location_id ubigint,
+        auxilliary_attributes_id ubigint,
+        application_deadline timestamp with time zone,
+        vacancies bigint,
+        dlt_load_id varchar
+    )
+{%- endmacro %}
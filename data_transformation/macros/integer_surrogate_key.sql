@@ -0,0 +1,7 @@
+{% macro integer_surrogate_key(field_list) -%}
+    {#- 64-bit surrogate key: the first 16 hex digits of dbt_utils' md5 key as a ubigint.
+        Same inputs and null handling as generate_surrogate_key, but joins and group-bys
+        on it compare one integer instead of a 32-char string. Collisions are checked by
+        tests/audit/test_surrogate_key_collisions.sql -#}
+    ('0x' || left({{ dbt_utils.generate_surrogate_key(field_list) }}, 16))::ubigint
+{%- endmacro %}
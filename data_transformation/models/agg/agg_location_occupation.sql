@@ -0,0 +1,75 @@
+/*
+  Incremental aggregate the geography mart rolls up from: vacancies and job ads
+  per location and occupation. Maintained from fact deltas the same way as
+  agg_occupation_deadline.
+*/
+
+{{ config(
+    materialized='incremental',
+    unique_key='agg_key',
+    incremental_strategy='delete+insert',
+    pre_hook="{{ create_fct_job_ads_changes(ref('fct_job_ads'), this.identifier) }}",
+    post_hook="delete from {{ fct_job_ads_changes(ref('fct_job_ads'), this.identifier) }}"
+) }}
+
+WITH
+{% if is_incremental() %}
+-- newest load already counted
+applied AS (
+    SELECT COALESCE(MAX(applied_load_id), '') AS load_id FROM {{ this }}
+),
+{% endif %}
+
+changes AS (
+    SELECT
+        location_id,
+        occupation_id,
+        COALESCE(vacancies, 0) AS vacancies,  -- see agg_occupation_deadline
+        1 AS job_ads_count,
+        dlt_load_id
+    FROM {{ ref('fct_job_ads') }}
+    {% if is_incremental() %}
+    WHERE dlt_load_id > (SELECT load_id FROM applied)
+
+    UNION ALL
+
+    SELECT
+        location_id,
+        occupation_id,
+        -COALESCE(vacancies, 0),
+        -1,
+        NULL  -- a removal does not move the loaded watermark
+    FROM {{ fct_job_ads_changes(ref('fct_job_ads'), this.identifier) }}
+    WHERE dlt_load_id <= (SELECT load_id FROM applied)
+    {% endif %}
+),
+
+deltas AS (
+    SELECT
+        {{ integer_surrogate_key(['location_id', 'occupation_id']) }} AS agg_key,
+        location_id,
+        occupation_id,
+        SUM(vacancies) AS vacancies,
+        SUM(job_ads_count) AS job_ads_count,
+        MAX(dlt_load_id) AS applied_load_id
+    FROM changes
+    GROUP BY ALL
+)
+
+SELECT
+    d.agg_key,
+    d.location_id,
+    d.occupation_id,
+    {% if is_incremental() %}
+    CAST(COALESCE(a.vacancies, 0) + d.vacancies AS BIGINT) AS vacancies,
+    CAST(COALESCE(a.job_ads_count, 0) + d.job_ads_count AS BIGINT) AS job_ads_count,
+    GREATEST(a.applied_load_id, d.applied_load_id) AS applied_load_id
+    {% else %}
+    CAST(d.vacancies AS BIGINT) AS vacancies,
+    CAST(d.job_ads_count AS BIGINT) AS job_ads_count,
+    d.applied_load_id
+    {% endif %}
+FROM deltas d
+{% if is_incremental() %}
+LEFT JOIN {{ this }} a ON a.agg_key = d.agg_key
+{% endif %}
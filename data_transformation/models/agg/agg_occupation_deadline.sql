@@ -0,0 +1,110 @@
+/*
+  Incremental aggregate the occupation demand, requirements and urgency marts
+  roll up from: vacancies and job ads per occupation and application deadline
+  day, with the vacancies of ads requiring experience, a driver's license or a
+  car alongside.
+
+  A build only applies the change since the last one, as per-key deltas:
+  + the fact rows loaded since, - the previous versions of ads fct_job_ads logged
+  when it replaced or removed them (only those already counted here). Keys left
+  without ads stay as zero rows, the marts skip them.
+*/
+
+{#- every logged change is applied after a build (or was never counted), so the
+    post hook empties the log -#}
+{{ config(
+    materialized='incremental',
+    unique_key='agg_key',
+    incremental_strategy='delete+insert',
+    pre_hook="{{ create_fct_job_ads_changes(ref('fct_job_ads'), this.identifier) }}",
+    post_hook="delete from {{ fct_job_ads_changes(ref('fct_job_ads'), this.identifier) }}"
+) }}
+
+WITH
+{% if is_incremental() %}
+-- newest load already counted
+applied AS (
+    SELECT COALESCE(MAX(applied_load_id), '') AS load_id FROM {{ this }}
+),
+{% endif %}
+
+-- every requirement combination an ad's auxilliary_attributes_id can hash from;
+-- dim_auxilliary_attributes only has those of live ads, removed ones need theirs too
+requirements AS (
+    SELECT
+        {{ dim_key('dim_auxilliary_attributes') }} AS auxilliary_attributes_id,
+        experience_required,
+        driver_license,
+        access_to_own_car
+    FROM (VALUES (TRUE), (FALSE)) AS e(experience_required)
+    CROSS JOIN (VALUES (TRUE), (FALSE)) AS d(driver_license)
+    CROSS JOIN (VALUES (TRUE), (FALSE)) AS c(access_to_own_car)
+),
+
+changes AS (
+    SELECT
+        occupation_id,
+        auxilliary_attributes_id,
+        application_deadline,
+        -- staging can have ads without a vacancy count; a null would null the whole
+        -- delta of its key, and a stored total with it
+        COALESCE(vacancies, 0) AS vacancies,
+        1 AS job_ads_count,
+        dlt_load_id
+    FROM {{ ref('fct_job_ads') }}
+    {% if is_incremental() %}
+    WHERE dlt_load_id > (SELECT load_id FROM applied)
+
+    UNION ALL
+
+    SELECT
+        occupation_id,
+        auxilliary_attributes_id,
+        application_deadline,
+        -COALESCE(vacancies, 0),
+        -1,
+        NULL  -- a removal does not move the loaded watermark
+    FROM {{ fct_job_ads_changes(ref('fct_job_ads'), this.identifier) }}
+    WHERE dlt_load_id <= (SELECT load_id FROM applied)
+    {% endif %}
+),
+
+deltas AS (
+    SELECT
+        {{ integer_surrogate_key(['c.occupation_id', 'CAST(c.application_deadline AS DATE)']) }} AS agg_key,
+        c.occupation_id,
+        CAST(c.application_deadline AS DATE) AS deadline_date,
+        SUM(c.vacancies) AS vacancies,
+        SUM(CASE WHEN r.experience_required THEN c.vacancies ELSE 0 END) AS experience_required_vacancies,
+        SUM(CASE WHEN r.driver_license THEN c.vacancies ELSE 0 END) AS driver_license_vacancies,
+        SUM(CASE WHEN r.access_to_own_car THEN c.vacancies ELSE 0 END) AS own_car_vacancies,
+        SUM(c.job_ads_count) AS job_ads_count,
+        MAX(c.dlt_load_id) AS applied_load_id
+    FROM changes c
+    LEFT JOIN requirements r ON c.auxilliary_attributes_id = r.auxilliary_attributes_id
+    GROUP BY agg_key, c.occupation_id, deadline_date
+)
+
+SELECT
+    d.agg_key,
+    d.occupation_id,
+    d.deadline_date,
+    {% if is_incremental() %}
+    CAST(COALESCE(a.vacancies, 0) + d.vacancies AS BIGINT) AS vacancies,
+    CAST(COALESCE(a.experience_required_vacancies, 0) + d.experience_required_vacancies AS BIGINT) AS experience_required_vacancies,
+    CAST(COALESCE(a.driver_license_vacancies, 0) + d.driver_license_vacancies AS BIGINT) AS driver_license_vacancies,
+    CAST(COALESCE(a.own_car_vacancies, 0) + d.own_car_vacancies AS BIGINT) AS own_car_vacancies,
+    CAST(COALESCE(a.job_ads_count, 0) + d.job_ads_count AS BIGINT) AS job_ads_count,
+    GREATEST(a.applied_load_id, d.applied_load_id) AS applied_load_id
+    {% else %}
+    CAST(d.vacancies AS BIGINT) AS vacancies,
+    CAST(d.experience_required_vacancies AS BIGINT) AS experience_required_vacancies,
+    CAST(d.driver_license_vacancies AS BIGINT) AS driver_license_vacancies,
+    CAST(d.own_car_vacancies AS BIGINT) AS own_car_vacancies,
+    CAST(d.job_ads_count AS BIGINT) AS job_ads_count,
+    d.applied_load_id
+    {% endif %}
+FROM deltas d
+{% if is_incremental() %}
+LEFT JOIN {{ this }} a ON a.agg_key = d.agg_key
+{% endif %}
@@ -1,7 +1,7 @@
 with src_auxilliary_attributes as (select * from {{ ref('src_auxilliary_attributes') }})
 
 select
-    {{ dbt_utils.generate_surrogate_key(['access_to_own_car','driver_license','experience_required']) }} as auxilliary_attributes_id,
+    {{ dim_key('dim_auxilliary_attributes') }} as auxilliary_attributes_id,
     experience_required,
     driver_license,
     access_to_own_car
@@ -1,9 +1,7 @@
 with src_employer as (select * from {{ ref('src_employer') }})
 
 select
-    {{ dbt_utils.generate_surrogate_key(
-        ['employer_name', 'employer_organization_number', 'employer_workplace']
-        ) }} as employer_id, -- alpha-numerical order
+    {{ dim_key('dim_employer') }} as employer_id, -- alpha-numerical order
     employer_organization_number,
     employer_name,
     employer_workplace,
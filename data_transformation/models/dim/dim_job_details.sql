@@ -1,7 +1,7 @@
 with src_job_details as (select * from {{ ref('src_job_details') }})
 
 select
-    {{ dbt_utils.generate_surrogate_key(['job_ad_id']) }} as job_details_id,
+    {{ dim_key('dim_job_details') }} as job_details_id,
     headline,
     description,
     description_html_formatted,
@@ -1,9 +1,7 @@
 with src_location as (select * from {{ ref('src_location') }})
 
 select
-    {{ dbt_utils.generate_surrogate_key(
-        ['location_country_code', 'location_municipality_code', 'location_region_code']
-        ) }} as location_id,  -- alpha-numerical order
+    {{ dim_key('dim_location') }} as location_id,  -- alpha-numerical order
         location_country,
         location_country_code,
         location_region,
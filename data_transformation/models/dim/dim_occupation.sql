@@ -1,7 +1,7 @@
 with src_occupation as (select * from {{ ref('src_occupation') }})
 
 select
-    {{ dbt_utils.generate_surrogate_key(['occupation_label']) }} as occupation_id,
+    {{ dim_key('dim_occupation') }} as occupation_id,
     occupation_label,
     -- max() + group by for unqiue rows
     max(occupation_group) as occupation_group,
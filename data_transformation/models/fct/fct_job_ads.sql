@@ -1,75 +1,63 @@
+-- incremental: a build only re-derives the ads loaded since the last one and
+-- replaces their rows (duckdb has no merge, so delete+insert on job_ad_id)
+{{ config(
+    materialized='incremental',
+    unique_key='job_ad_id',
+    incremental_strategy='delete+insert',
+    pre_hook="
+      {% for consumer in fct_job_ads_change_consumers() %}
+      {% if not is_incremental() %}
+      -- a full build starts the logs over, the aggregates have to be rebuilt with it
+      drop table if exists {{ fct_job_ads_changes(this, consumer) }};
+      {% endif %}
+      {{ create_fct_job_ads_changes(this, consumer) }};
+      {% if is_incremental() %}
+      -- keep the rows about to be replaced or removed, the aggregates subtract them
+      insert into {{ fct_job_ads_changes(this, consumer) }}
+        select job_ad_id, occupation_id, employer_id, location_id, auxilliary_attributes_id,
+          application_deadline, vacancies, dlt_load_id
+        from {{ this }}
+        where job_ad_id in (
+            select id from {{ source('job_ads', 'stg_ads') }}
+            where _dlt_load_id > (select max(dlt_load_id) from {{ this }})
+          )
+          or job_ad_id not in (
+            select id from {{ source('job_ads', 'stg_ads') }} where not coalesce(removed, false)
+          );
+      {% endif %}
+      {% endfor %}
+    ",
+    post_hook="
+      -- ads removed since (tombstoned by an incremental load, or gone after a full load)
+      delete from {{ this }}
+      where job_ad_id not in (
+        select id from {{ source('job_ads', 'stg_ads') }} where not coalesce(removed, false)
+      )
+    "
+) }}
+
 with base as (
   select * from {{ ref('src_job_ads') }}
-),
-
-auxilliary_attributes_dim as (
-  select
-    auxilliary_attributes_id,
-    experience_required,
-    driver_license,
-    access_to_own_car
-  from {{ ref('dim_auxilliary_attributes') }}
-),
-
-employer_dim as (
-  select
-    employer_id,
-    employer_organization_number,
-    employer_name,
-    employer_workplace
-  from {{ ref('dim_employer') }}
-),
-
-occupation_dim as (
-  select
-    occupation_id,
-    occupation_label
-  from {{ ref('dim_occupation') }}
-),
-
-job_details_dim as (
-  select
-    job_details_id,
-    job_ad_id
-  from {{ ref('dim_job_details') }}
-),
-
-location_dim as (
-  select
-    location_id,
-    location_country_code,
-    location_region_code,
-    location_municipality_code
-  from {{ ref('dim_location') }}
+  {% if is_incremental() %}
+  where dlt_load_id > (select coalesce(max(dlt_load_id), '') from {{ this }})
+  {% endif %}
 )
 
 select
+  base.job_ad_id,
   base.vacancies,
   base.relevance,
   base.application_deadline,
   base.publication_date,
   base.last_publication_date,
 
-  a.auxilliary_attributes_id as auxilliary_attributes_id, -- foreign key linking to dim_auxilliary_attributes
-  e.employer_id as employer_id, -- foreign key linking to dim_employer
-  o.occupation_id as occupation_id, -- foreign key linking to dim_occupation
-  jd.job_details_id as job_details_id,  -- foreign key linking to dim_job_details
-  loc.location_id as location_id
+  -- foreign keys, hashed from the natural keys the same way the dims hash them
+  {{ fct_dim_key('dim_auxilliary_attributes') }} as auxilliary_attributes_id,
+  {{ fct_dim_key('dim_employer') }} as employer_id,
+  {{ fct_dim_key('dim_occupation') }} as occupation_id,
+  {{ fct_dim_key('dim_job_details') }} as job_details_id,
+  {{ fct_dim_key('dim_location') }} as location_id,
+
+  base.dlt_load_id
 
 from base
-left join auxilliary_attributes_dim a
-  on base.experience_required = a.experience_required 
-    and base.driver_license = a.driver_license
-    and base.access_to_own_car = a.access_to_own_car
-left join employer_dim e
-  on base.employer_organization_number = e.employer_organization_number
-    and base.employer_name = e.employer_name
-    and base.employer_workplace = e.employer_workplace
-left join occupation_dim o
-  on base.occupation_label = o.occupation_label
-left join job_details_dim jd
-    on base.job_ad_id = jd.job_ad_id
-left join location_dim loc
-    on base.location_country_code = loc.location_country_code
-    and base.location_region_code = loc.location_region_code
-    and base.location_municipality_code = loc.location_municipality_code
@@ -7,7 +7,8 @@ fct_job_ads AS (
         location_id,
         occupation_id,
         vacancies
-    FROM {{ ref('fct_job_ads') }}
+    FROM {{ ref('agg_location_occupation') }}
+    WHERE job_ads_count > 0
 ),
 
 dim_location AS (
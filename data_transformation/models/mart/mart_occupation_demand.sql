@@ -3,33 +3,27 @@
   Focuses on total demand and rankings by occupation hierarchy
 */
 
-WITH job_ads_fct AS (
-    SELECT * FROM {{ ref('fct_job_ads') }}
-),
-
-job_details_dim AS (
-    SELECT * FROM {{ ref('dim_job_details') }}
+WITH job_ads_agg AS (
+    SELECT * FROM {{ ref('agg_occupation_deadline') }}
 ),
 
 occupation_dim AS (
     SELECT * FROM {{ ref('dim_occupation') }}
 ),
 
--- Base join between facts and dimensions with active job filtering
+-- Base join between the aggregated facts and dimensions with active job filtering
 base AS (
     SELECT
-        jd.job_ad_id,
-        ja.publication_date,
-        ja.vacancies,
-        ja.occupation_id,
+        agg.vacancies,
+        agg.job_ads_count,
+        agg.occupation_id,
         o.occupation_field,
         o.occupation_group,
-        o.occupation_label,
-        DATEDIFF('day', CURRENT_DATE(), ja.application_deadline) AS days_to_deadline
-    FROM job_ads_fct ja
-    LEFT JOIN job_details_dim jd ON ja.job_details_id = jd.job_details_id
-    LEFT JOIN occupation_dim o ON ja.occupation_id = o.occupation_id
-    WHERE DATEDIFF('day', CURRENT_DATE(), ja.application_deadline) >= 0  -- Only consider active job ads
+        o.occupation_label
+    FROM job_ads_agg agg
+    LEFT JOIN occupation_dim o ON agg.occupation_id = o.occupation_id
+    WHERE DATEDIFF('day', CURRENT_DATE(), agg.deadline_date) >= 0  -- Only consider active job ads
+      AND agg.job_ads_count > 0
 ),
 
 -- Aggregate by occupation field
@@ -39,7 +33,7 @@ occupation_field_metrics AS (
         NULL AS occupation_group,
         NULL AS occupation_label,
         SUM(vacancies) AS vacancy_count,
-        COUNT(DISTINCT job_ad_id) AS job_ads_count
+        SUM(job_ads_count)::BIGINT AS job_ads_count
     FROM base
     GROUP BY occupation_field
 ),
@@ -51,7 +45,7 @@ occupation_group_metrics AS (
         occupation_group,
         NULL AS occupation_label,
         SUM(vacancies) AS vacancy_count,
-        COUNT(DISTINCT job_ad_id) AS job_ads_count
+        SUM(job_ads_count)::BIGINT AS job_ads_count
     FROM base
     GROUP BY occupation_field, occupation_group
 ),
@@ -63,7 +57,7 @@ occupation_label_metrics AS (
         occupation_group,
         occupation_label,
         SUM(vacancies) AS vacancy_count,
-        COUNT(DISTINCT job_ad_id) AS job_ads_count
+        SUM(job_ads_count)::BIGINT AS job_ads_count
     FROM base
     GROUP BY occupation_field, occupation_group, occupation_label
 ),
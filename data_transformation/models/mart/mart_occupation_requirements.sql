@@ -3,38 +3,28 @@
   Focuses on requirement percentages like experience, driver's license, and car by occupation hierarchy
 */
 
-WITH job_ads_fct AS (
-    SELECT * FROM {{ ref('fct_job_ads') }}
-),
-
-job_details_dim AS (
-    SELECT * FROM {{ ref('dim_job_details') }}
+WITH job_ads_agg AS (
+    SELECT * FROM {{ ref('agg_occupation_deadline') }}
 ),
 
 occupation_dim AS (
     SELECT * FROM {{ ref('dim_occupation') }}
 ),
 
-auxilliary_attributes_dim AS (
-    SELECT * FROM {{ ref('dim_auxilliary_attributes') }}
-),
-
--- Base join between facts and dimensions with active job filtering
+-- Base join between the aggregated facts and dimensions with active job filtering
 base AS (
     SELECT
-        jd.job_ad_id,
-        ja.vacancies,
+        agg.vacancies,
+        agg.experience_required_vacancies,
+        agg.driver_license_vacancies,
+        agg.own_car_vacancies,
         o.occupation_field,
         o.occupation_group,
-        o.occupation_label,
-        a.experience_required,
-        a.driver_license,
-        a.access_to_own_car
-    FROM job_ads_fct ja
-    LEFT JOIN job_details_dim jd ON ja.job_details_id = jd.job_details_id
-    LEFT JOIN occupation_dim o ON ja.occupation_id = o.occupation_id
-    LEFT JOIN auxilliary_attributes_dim a ON ja.auxilliary_attributes_id = a.auxilliary_attributes_id
-    WHERE DATEDIFF('day', CURRENT_DATE(), ja.application_deadline) >= 0  -- Only consider active job ads
+        o.occupation_label
+    FROM job_ads_agg agg
+    LEFT JOIN occupation_dim o ON agg.occupation_id = o.occupation_id
+    WHERE DATEDIFF('day', CURRENT_DATE(), agg.deadline_date) >= 0  -- Only consider active job ads
+      AND agg.job_ads_count > 0
 ),
 
 -- Aggregate metrics by occupation field
@@ -46,18 +36,18 @@ field_requirements AS (
         SUM(vacancies) AS total_vacancies,
         
         -- Experience requirements
-        SUM(CASE WHEN experience_required = TRUE THEN vacancies ELSE 0 END) AS experience_required_count,
-        ROUND(100.0 * SUM(CASE WHEN experience_required = TRUE THEN vacancies ELSE 0 END) / 
+        SUM(experience_required_vacancies) AS experience_required_count,
+        ROUND(100.0 * SUM(experience_required_vacancies) / 
               NULLIF(SUM(vacancies), 0), 1) AS experience_required_percentage,
         
         -- Driver's license requirements
-        SUM(CASE WHEN driver_license = TRUE THEN vacancies ELSE 0 END) AS driver_license_count,
-        ROUND(100.0 * SUM(CASE WHEN driver_license = TRUE THEN vacancies ELSE 0 END) / 
+        SUM(driver_license_vacancies) AS driver_license_count,
+        ROUND(100.0 * SUM(driver_license_vacancies) / 
               NULLIF(SUM(vacancies), 0), 1) AS driver_license_percentage,
         
         -- Car requirements
-        SUM(CASE WHEN access_to_own_car = TRUE THEN vacancies ELSE 0 END) AS own_car_count,
-        ROUND(100.0 * SUM(CASE WHEN access_to_own_car = TRUE THEN vacancies ELSE 0 END) / 
+        SUM(own_car_vacancies) AS own_car_count,
+        ROUND(100.0 * SUM(own_car_vacancies) / 
               NULLIF(SUM(vacancies), 0), 1) AS own_car_percentage
     FROM base
     GROUP BY occupation_field
@@ -72,18 +62,18 @@ group_requirements AS (
         SUM(vacancies) AS total_vacancies,
         
         -- Experience requirements
-        SUM(CASE WHEN experience_required = TRUE THEN vacancies ELSE 0 END) AS experience_required_count,
-        ROUND(100.0 * SUM(CASE WHEN experience_required = TRUE THEN vacancies ELSE 0 END) / 
+        SUM(experience_required_vacancies) AS experience_required_count,
+        ROUND(100.0 * SUM(experience_required_vacancies) / 
               NULLIF(SUM(vacancies), 0), 1) AS experience_required_percentage,
         
         -- Driver's license requirements
-        SUM(CASE WHEN driver_license = TRUE THEN vacancies ELSE 0 END) AS driver_license_count,
-        ROUND(100.0 * SUM(CASE WHEN driver_license = TRUE THEN vacancies ELSE 0 END) / 
+        SUM(driver_license_vacancies) AS driver_license_count,
+        ROUND(100.0 * SUM(driver_license_vacancies) / 
               NULLIF(SUM(vacancies), 0), 1) AS driver_license_percentage,
         
         -- Car requirements
-        SUM(CASE WHEN access_to_own_car = TRUE THEN vacancies ELSE 0 END) AS own_car_count,
-        ROUND(100.0 * SUM(CASE WHEN access_to_own_car = TRUE THEN vacancies ELSE 0 END) / 
+        SUM(own_car_vacancies) AS own_car_count,
+        ROUND(100.0 * SUM(own_car_vacancies) / 
               NULLIF(SUM(vacancies), 0), 1) AS own_car_percentage
     FROM base
     GROUP BY occupation_field, occupation_group
@@ -98,18 +88,18 @@ occupation_requirements AS (
         SUM(vacancies) AS total_vacancies,
         
         -- Experience requirements
-        SUM(CASE WHEN experience_required = TRUE THEN vacancies ELSE 0 END) AS experience_required_count,
-        ROUND(100.0 * SUM(CASE WHEN experience_required = TRUE THEN vacancies ELSE 0 END) / 
+        SUM(experience_required_vacancies) AS experience_required_count,
+        ROUND(100.0 * SUM(experience_required_vacancies) / 
               NULLIF(SUM(vacancies), 0), 1) AS experience_required_percentage,
         
         -- Driver's license requirements
-        SUM(CASE WHEN driver_license = TRUE THEN vacancies ELSE 0 END) AS driver_license_count,
-        ROUND(100.0 * SUM(CASE WHEN driver_license = TRUE THEN vacancies ELSE 0 END) / 
+        SUM(driver_license_vacancies) AS driver_license_count,
+        ROUND(100.0 * SUM(driver_license_vacancies) / 
               NULLIF(SUM(vacancies), 0), 1) AS driver_license_percentage,
         
         -- Car requirements
-        SUM(CASE WHEN access_to_own_car = TRUE THEN vacancies ELSE 0 END) AS own_car_count,
-        ROUND(100.0 * SUM(CASE WHEN access_to_own_car = TRUE THEN vacancies ELSE 0 END) / 
+        SUM(own_car_vacancies) AS own_car_count,
+        ROUND(100.0 * SUM(own_car_vacancies) / 
               NULLIF(SUM(vacancies), 0), 1) AS own_car_percentage
     FROM base
     GROUP BY occupation_field, occupation_group, occupation_label
@@ -6,6 +6,10 @@
     * publication_date on x-axis
     * number of vacancies on y-axis
     * filterable by occupation field and group
+
+  The facts are scanned once, into daily totals per occupation label; every
+  granularity and occupation level is rolled up from those in one GROUPING SETS
+  pass (analyses/mart_trends_union_all.sql has the nine-scan version it replaced)
 */
 
 WITH job_ads_fct AS (
@@ -16,267 +20,72 @@ occupation_dim AS (
     SELECT * FROM {{ ref('dim_occupation') }}
 ),
 
--- Base join between facts and dimensions
-base AS (
+-- Daily totals at the finest level, the only pass over the facts
+daily AS (
     SELECT
-        job_ads_fct.publication_date,
-        job_ads_fct.vacancies,
+        DATE_TRUNC('day', job_ads_fct.publication_date) AS trend_day,
         occupation_dim.occupation_field,
         occupation_dim.occupation_group,
-        occupation_dim.occupation_label
+        occupation_dim.occupation_label,
+        SUM(job_ads_fct.vacancies) AS vacancies,
+        COUNT(*) AS job_posts
     FROM job_ads_fct
     LEFT JOIN occupation_dim
         ON job_ads_fct.occupation_id = occupation_dim.occupation_id
+    GROUP BY ALL
 ),
 
--- Convert publication_date to truncated date format (day level)
--- This allows for daily trend analysis
-daily_trends AS (
-    SELECT
-        DATE_TRUNC('day', publication_date) AS trend_date,
-        occupation_field,
-        occupation_group,
-        occupation_label,
-        SUM(vacancies) AS daily_vacancies,
-        COUNT(*) AS daily_job_posts
-    FROM base
-    GROUP BY
-        DATE_TRUNC('day', publication_date),
-        occupation_field,
-        occupation_group,
-        occupation_label
-),
-
--- Weekly aggregation for smoother trend visualization
-weekly_trends AS (
+-- Week and month keys, truncated from the day (same result as from publication_date)
+daily_keys AS (
     SELECT
-        DATE_TRUNC('week', publication_date) AS trend_date,
-        occupation_field,
-        occupation_group,
-        occupation_label,
-        SUM(vacancies) AS weekly_vacancies,
-        COUNT(*) AS weekly_job_posts
-    FROM base
-    GROUP BY
-        DATE_TRUNC('week', publication_date),
-        occupation_field,
-        occupation_group,
-        occupation_label
+        *,
+        DATE_TRUNC('week', trend_day) AS trend_week,
+        DATE_TRUNC('month', trend_day) AS trend_month
+    FROM daily
 ),
 
--- Monthly aggregation for longer-term trend analysis
-monthly_trends AS (
+-- label / group / field level x day / week / month
+rolled_up AS (
     SELECT
-        DATE_TRUNC('month', publication_date) AS trend_date,
+        trend_day,
+        trend_week,
+        trend_month,
         occupation_field,
         occupation_group,
         occupation_label,
-        SUM(vacancies) AS monthly_vacancies,
-        COUNT(*) AS monthly_job_posts
-    FROM base
-    GROUP BY
-        DATE_TRUNC('month', publication_date),
-        occupation_field,
-        occupation_group,
-        occupation_label
-),
-
--- Field level daily trends (highest level of aggregation)
-field_daily_trends AS (
-    SELECT
-        DATE_TRUNC('day', publication_date) AS trend_date,
-        occupation_field,
-        NULL AS occupation_group,
-        NULL AS occupation_label,
-        SUM(vacancies) AS daily_vacancies,
-        COUNT(*) AS daily_job_posts
-    FROM base
-    GROUP BY
-        DATE_TRUNC('day', publication_date),
-        occupation_field
-),
-
--- Field level weekly trends
-field_weekly_trends AS (
-    SELECT
-        DATE_TRUNC('week', publication_date) AS trend_date,
-        occupation_field,
-        NULL AS occupation_group,
-        NULL AS occupation_label,
-        SUM(vacancies) AS weekly_vacancies,
-        COUNT(*) AS weekly_job_posts
-    FROM base
-    GROUP BY
-        DATE_TRUNC('week', publication_date),
-        occupation_field
-),
-
--- Field level monthly trends
-field_monthly_trends AS (
-    SELECT
-        DATE_TRUNC('month', publication_date) AS trend_date,
-        occupation_field,
-        NULL AS occupation_group,
-        NULL AS occupation_label,
-        SUM(vacancies) AS monthly_vacancies,
-        COUNT(*) AS monthly_job_posts
-    FROM base
-    GROUP BY
-        DATE_TRUNC('month', publication_date),
-        occupation_field
-),
-
--- Group level daily trends (mid-level aggregation)
-group_daily_trends AS (
-    SELECT
-        DATE_TRUNC('day', publication_date) AS trend_date,
-        occupation_field,
-        occupation_group,
-        NULL AS occupation_label,
-        SUM(vacancies) AS daily_vacancies,
-        COUNT(*) AS daily_job_posts
-    FROM base
-    GROUP BY
-        DATE_TRUNC('day', publication_date),
-        occupation_field,
-        occupation_group
-),
-
--- Group level weekly trends
-group_weekly_trends AS (
-    SELECT
-        DATE_TRUNC('week', publication_date) AS trend_date,
-        occupation_field,
-        occupation_group,
-        NULL AS occupation_label,
-        SUM(vacancies) AS weekly_vacancies,
-        COUNT(*) AS weekly_job_posts
-    FROM base
-    GROUP BY
-        DATE_TRUNC('week', publication_date),
-        occupation_field,
-        occupation_group
-),
-
--- Group level monthly trends
-group_monthly_trends AS (
-    SELECT
-        DATE_TRUNC('month', publication_date) AS trend_date,
-        occupation_field,
-        occupation_group,
-        NULL AS occupation_label,
-        SUM(vacancies) AS monthly_vacancies,
-        COUNT(*) AS monthly_job_posts
-    FROM base
-    GROUP BY
-        DATE_TRUNC('month', publication_date),
-        occupation_field,
-        occupation_group
+        SUM(vacancies) AS vacancies,
+        SUM(job_posts) AS job_posts,
+        GROUPING(trend_day) AS is_not_daily,
+        GROUPING(trend_week) AS is_not_weekly
+    FROM daily_keys
+    GROUP BY GROUPING SETS (
+        (trend_day, occupation_field, occupation_group, occupation_label),
+        (trend_day, occupation_field, occupation_group),
+        (trend_day, occupation_field),
+        (trend_week, occupation_field, occupation_group, occupation_label),
+        (trend_week, occupation_field, occupation_group),
+        (trend_week, occupation_field),
+        (trend_month, occupation_field, occupation_group, occupation_label),
+        (trend_month, occupation_field, occupation_group),
+        (trend_month, occupation_field)
+    )
 )
 
 -- Final combined model with time granularity indicator
 SELECT
-    'daily' AS time_granularity,
-    trend_date,
-    occupation_field,
-    occupation_group,
-    occupation_label,
-    daily_vacancies AS vacancies,
-    daily_job_posts AS job_posts
-FROM daily_trends
-
-UNION ALL
-
-SELECT
-    'daily' AS time_granularity,
-    trend_date,
-    occupation_field,
-    occupation_group,
-    occupation_label,
-    daily_vacancies AS vacancies,
-    daily_job_posts AS job_posts
-FROM field_daily_trends
-
-UNION ALL
-
-SELECT
-    'daily' AS time_granularity,
-    trend_date,
-    occupation_field,
-    occupation_group,
-    occupation_label,
-    daily_vacancies AS vacancies,
-    daily_job_posts AS job_posts
-FROM group_daily_trends
-
-UNION ALL
-
-SELECT
-    'weekly' AS time_granularity,
-    trend_date,
-    occupation_field,
-    occupation_group,
-    occupation_label,
-    weekly_vacancies AS vacancies,
-    weekly_job_posts AS job_posts
-FROM weekly_trends
-
-UNION ALL
-
-SELECT
-    'weekly' AS time_granularity,
-    trend_date,
-    occupation_field,
-    occupation_group,
-    occupation_label,
-    weekly_vacancies AS vacancies,
-    weekly_job_posts AS job_posts
-FROM field_weekly_trends
-
-UNION ALL
-
-SELECT
-    'weekly' AS time_granularity,
-    trend_date,
-    occupation_field,
-    occupation_group,
-    occupation_label,
-    weekly_vacancies AS vacancies,
-    weekly_job_posts AS job_posts
-FROM group_weekly_trends
-
-UNION ALL
-
-SELECT
-    'monthly' AS time_granularity,
-    trend_date,
-    occupation_field,
-    occupation_group,
-    occupation_label,
-    monthly_vacancies AS vacancies,
-    monthly_job_posts AS job_posts
-FROM monthly_trends
-
-UNION ALL
-
-SELECT
-    'monthly' AS time_granularity,
-    trend_date,
-    occupation_field,
-    occupation_group,
-    occupation_label,
-    monthly_vacancies AS vacancies,
-    monthly_job_posts AS job_posts
-FROM field_monthly_trends
-
-UNION ALL
-
-SELECT
-    'monthly' AS time_granularity,
-    trend_date,
+    CASE
+        WHEN is_not_daily = 0 THEN 'daily'
+        WHEN is_not_weekly = 0 THEN 'weekly'
+        ELSE 'monthly'
+    END AS time_granularity,
+    CASE
+        WHEN is_not_daily = 0 THEN trend_day
+        WHEN is_not_weekly = 0 THEN trend_week
+        ELSE trend_month
+    END AS trend_date,
     occupation_field,
     occupation_group,
     occupation_label,
-    monthly_vacancies AS vacancies,
-    monthly_job_posts AS job_posts
-FROM group_monthly_trends
+    vacancies,
+    CAST(job_posts AS BIGINT) AS job_posts
+FROM rolled_up
@@ -4,11 +4,8 @@
 */
 
 WITH base AS (
-  SELECT * FROM {{ ref('fct_job_ads') }}
-),
-
-job_details_dim AS (
-  SELECT * FROM {{ ref('dim_job_details') }}
+  SELECT * FROM {{ ref('agg_occupation_deadline') }}
+  WHERE job_ads_count > 0
 ),
 
 occupation_dim AS (
@@ -16,13 +13,13 @@ occupation_dim AS (
 ),
 
 urgency_int AS (SELECT
-  jd.job_ad_id,
-  b.application_deadline,
-  DATEDIFF('day', CURRENT_DATE(), b.application_deadline) AS days_to_deadline,
+  b.job_ads_count,
+  b.deadline_date,
+  DATEDIFF('day', CURRENT_DATE(), b.deadline_date) AS days_to_deadline,
   CASE 
-    WHEN DATEDIFF('day', CURRENT_DATE(), b.application_deadline) <= 7 THEN 'urgent_7days'
-    WHEN DATEDIFF('day', CURRENT_DATE(), b.application_deadline) <= 14 THEN 'closing_14days'
-    WHEN DATEDIFF('day', CURRENT_DATE(), b.application_deadline) <= 30 THEN 'closing_30days'
+    WHEN DATEDIFF('day', CURRENT_DATE(), b.deadline_date) <= 7 THEN 'urgent_7days'
+    WHEN DATEDIFF('day', CURRENT_DATE(), b.deadline_date) <= 14 THEN 'closing_14days'
+    WHEN DATEDIFF('day', CURRENT_DATE(), b.deadline_date) <= 30 THEN 'closing_30days'
     ELSE 'normal'
   END AS urgency_category,
   b.vacancies AS number_vacancies,
@@ -30,7 +27,6 @@ urgency_int AS (SELECT
   o.occupation_group,
   o.occupation_label
 FROM base b
-LEFT JOIN job_details_dim jd ON b.job_details_id = jd.job_details_id
 LEFT JOIN occupation_dim o ON b.occupation_id = o.occupation_id
 WHERE days_to_deadline >= 0  -- Only consider active job ads
 ),
@@ -42,7 +38,7 @@ urgency_field_metrics AS (
     NULL AS occupation_group,
     NULL AS occupation_label,
     urgency_category,
-    COUNT(job_ad_id) AS total_job_ads,
+    SUM(job_ads_count)::BIGINT AS total_job_ads,
     SUM(number_vacancies) AS total_vacancies
   FROM urgency_int 
   GROUP BY occupation_field, urgency_category
@@ -55,7 +51,7 @@ urgency_group_metrics AS (
     occupation_group,
     NULL AS occupation_label,
     urgency_category,
-    COUNT(job_ad_id) AS total_job_ads,
+    SUM(job_ads_count)::BIGINT AS total_job_ads,
     SUM(number_vacancies) AS total_vacancies
   FROM urgency_int
   GROUP BY occupation_field, occupation_group, urgency_category
@@ -68,7 +64,7 @@ urgency_label_metrics AS (
     occupation_group,
     occupation_label,
     urgency_category,
-    COUNT(job_ad_id) AS total_job_ads,
+    SUM(job_ads_count)::BIGINT AS total_job_ads,
     SUM(number_vacancies) AS total_vacancies
   FROM urgency_int
   GROUP BY occupation_field, occupation_group, occupation_label, urgency_category
@@ -1,4 +1,5 @@
-with stg_job_ads as (select * from {{ source('job_ads', 'stg_ads') }})
+-- incremental loads keep removed ads in staging as tombstones (removed = true)
+with stg_job_ads as (select * from {{ source('job_ads', 'stg_ads') }} where not coalesce(removed, false))
 
 select
     -- job_ads
@@ -26,5 +27,7 @@ select
     -- occupation
     occupation__label as occupation_label,
     occupation_group__label as occupation_group,
-    occupation_field__label as occupation_field
+    occupation_field__label as occupation_field,
+    -- the load that last wrote the ad, fct_job_ads only processes newer ones
+    _dlt_load_id as dlt_load_id
 from stg_job_ads
@@ -1,4 +1,4 @@
-with stg_job_ads as (select * from {{ source('job_ads', 'stg_ads') }})
+with stg_job_ads as (select * from {{ source('job_ads', 'stg_ads') }} where not coalesce(removed, false))
 
 select
     -- job_details
@@ -0,0 +1,23 @@
+-- This test fails if a foreign key in fct_job_ads has no row in its dimension.
+-- fct_job_ads computes the keys from the natural keys instead of joining the dims,
+-- so this is what checks that both still hash the same columns the same way
+
+{% set foreign_keys = {
+    'auxilliary_attributes_id': 'dim_auxilliary_attributes',
+    'employer_id': 'dim_employer',
+    'job_details_id': 'dim_job_details',
+    'location_id': 'dim_location',
+    'occupation_id': 'dim_occupation',
+} %}
+
+{% for key, dim in foreign_keys.items() %}
+SELECT
+  f.job_ad_id,
+  '{{ key }}' AS foreign_key,
+  f.{{ key }} AS key_value
+FROM {{ ref('fct_job_ads') }} f
+LEFT JOIN {{ ref(dim) }} d ON f.{{ key }} = d.{{ key }}
+WHERE f.{{ key }} IS NOT NULL
+  AND d.{{ key }} IS NULL
+{% if not loop.last %}UNION ALL{% endif %}
+{% endfor %}
@@ -0,0 +1,25 @@
+-- This test fails if two different natural keys hash to the same 64-bit surrogate key.
+-- The dims and aggregates keep one row per key, so a collision would silently merge
+-- them there; it is checked on the rows they are built from instead (the src models
+-- for the dims, fct_job_ads for each aggregate's key)
+
+{% set keyed_models = [
+    ('src_auxilliary_attributes', dim_natural_key('dim_auxilliary_attributes')),
+    ('src_employer', dim_natural_key('dim_employer')),
+    ('src_job_details', dim_natural_key('dim_job_details')),
+    ('src_location', dim_natural_key('dim_location')),
+    ('src_occupation', dim_natural_key('dim_occupation')),
+    ('fct_job_ads', ['occupation_id', 'CAST(application_deadline AS DATE)']),
+    ('fct_job_ads', ['location_id', 'occupation_id']),
+] %}
+
+{% for model, columns in keyed_models %}
+SELECT
+  '{{ model }}' AS model,
+  {{ integer_surrogate_key(columns) }} AS surrogate_key,
+  COUNT(DISTINCT ({{ columns | join(', ') }})) AS natural_keys
+FROM {{ ref(model) }}
+GROUP BY surrogate_key
+HAVING COUNT(DISTINCT ({{ columns | join(', ') }})) > 1
+{% if not loop.last %}UNION ALL{% endif %}
+{% endfor %}
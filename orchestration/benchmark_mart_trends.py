@@ -0,0 +1,115 @@
+# ======================== #
+#   mart_trends benchmark  #
+# ======================== #
+# Times the single-pass GROUPING SETS mart_trends model against the union-all
+# version it replaced (data_transformation/analyses/mart_trends_union_all.sql)
+# on a synthetic fact table in an in-memory duckdb, no warehouse or dbt needed.
+#
+#   python benchmark_mart_trends.py                     # 2M ads, 3 runs each
+#   python benchmark_mart_trends.py --rows 10000000 --runs 5
+#
+# Prints one json line per version with the number of scans of fct_job_ads in
+# its plan and its median seconds, and exits with 1 if the two results differ.
+
+import argparse
+import json
+import os
+from pathlib import Path
+import re
+import statistics
+import tempfile
+import time
+
+import duckdb
+
+DBT_PROJECT_DIR = Path(__file__).resolve().parents[1] / "data_transformation"
+VERSIONS = {
+    "union_all": DBT_PROJECT_DIR / "analyses" / "mart_trends_union_all.sql",
+    "grouping_sets": DBT_PROJECT_DIR / "models" / "mart" / "mart_trends.sql",
+}
+
+
+def render(sql_path):
+    """The model sql with every ref() pointing at the synthetic table of that name."""
+    return re.sub(r"\{\{\s*ref\('(\w+)'\)\s*\}\}", r"\1", sql_path.read_text())
+
+
+def create_synthetic_tables(con, rows):
+    """fct_job_ads with `rows` ads published over two years and a 400-label dim_occupation."""
+    con.execute("""
+        create table dim_occupation as
+        select
+            range::ubigint as occupation_id,
+            'label ' || range as occupation_label,
+            'group ' || range // 10 as occupation_group,
+            'field ' || range // 40 as occupation_field
+        from range(400)
+    """)
+    con.execute(f"""
+        create table fct_job_ads as
+        select
+            range::varchar as job_ad_id,
+            -- a few ads point at occupations missing from the dim, as in the real facts
+            hash(range) % 410 as occupation_id,
+            timestamptz '2024-01-01 00:00:00+00' + to_seconds((hash(range * 7) % (730 * 86400))::bigint) as publication_date,
+            (1 + hash(range * 13) % 5)::bigint as vacancies
+        from range({rows})
+    """)
+
+
+def fct_scans(con, sql):
+    """Table scans of fct_job_ads in the executed plan."""
+    with tempfile.TemporaryDirectory() as tmp:
+        profile = os.path.join(tmp, "profile.json")
+        con.execute("pragma enable_profiling = 'json'")
+        con.execute(f"pragma profiling_output = '{profile}'")
+        con.execute(f"create or replace temp table profiled as {sql}")
+        con.execute("pragma disable_profiling")
+        plan = json.loads(Path(profile).read_text())
+
+    def count(node):
+        scans = node.get("operator_name", "").strip() in ("SEQ_SCAN", "TABLE_SCAN") \
+            and node.get("extra_info", {}).get("Table") == "fct_job_ads"
+        return scans + sum(count(child) for child in node.get("children", []))
+
+    return count(plan)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000, help="ads in the synthetic fact table")
+    parser.add_argument("--runs", type=int, default=3, help="timed runs of each version")
+    args = parser.parse_args()
+
+    con = duckdb.connect()
+    create_synthetic_tables(con, args.rows)
+
+    for version, sql_path in VERSIONS.items():
+        sql = render(sql_path)
+        seconds = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            con.execute(f"create or replace temp table {version} as {sql}")
+            seconds.append(time.perf_counter() - started)
+        print(json.dumps({
+            "version": version,
+            "rows": args.rows,
+            "fct_scans": fct_scans(con, sql),
+            "median_seconds": round(statistics.median(seconds), 3),
+            "result_rows": con.sql(f"select count(*) from {version}").fetchone()[0],
+        }), flush=True)
+
+    differing = con.sql("""
+        select count(*) from (
+            (select * from union_all except all select * from grouping_sets)
+            union all
+            (select * from grouping_sets except all select * from union_all)
+        )
+    """).fetchone()[0]
+    if differing:
+        print(json.dumps({"error": f"{differing} rows differ between the versions"}))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# ======================== #
+#   In-process dbt check   #
+# ======================== #
+# Runs `dbt build` a few times in a row in one process through InProcessDbt,
+# the way DBT_EXECUTION_MODE=in_process does within a dagster run, and fails
+# when any of them does. Every build after the first reuses what the first one
+# left in the process, so this catches state leaking between invocations.
+#
+#   python check_in_process_dbt.py             # 2 builds of the warehouse at DUCKDB_PATH
+#   python check_in_process_dbt.py --builds 5
+#
+# The builds are incremental and write to the warehouse like a scheduled run.
+
+import argparse
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+from dotenv import load_dotenv
+
+from dbt_in_process import InProcessDbt
+
+load_dotenv()
+
+DBT_PROJECT_DIR = Path(__file__).resolve().parents[1] / "data_transformation"
+DBT_PROFILES_DIR = Path.home() / ".dbt"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--builds", type=int, default=2, help="builds to run in a row")
+    parser.add_argument("--profiles-dir", default=str(DBT_PROFILES_DIR))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as target_path:
+        dbt = InProcessDbt(DBT_PROJECT_DIR, args.profiles_dir, target_path)
+        for build in range(1, args.builds + 1):
+            started = time.perf_counter()
+            try:
+                result = dbt.invoke(["build", "--quiet"])
+            except Exception as exc:
+                sys.exit(f"build {build} failed: {type(exc).__name__}: {exc}")
+            print(f"build {build}: {len(result.result.results)} nodes in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# ============================= #
+#   Incremental models check    #
+# ============================= #
+# Edits, removes and adds ads in the staging table of a copy of the warehouse,
+# builds the copy incrementally after each round and checks that the fact,
+# the aggregates and the marts then equal a --full-refresh build of the same
+# staging rows. The warehouse itself is only copied.
+#
+#   python check_incremental_models.py           # copies the warehouse at DUCKDB_PATH
+#
+# Some of the changed ads have no vacancy count, as real ads sometimes do.
+# Exits with 1 and the differing tables when the builds disagree.
+
+import argparse
+import os
+from pathlib import Path
+import shutil
+import sys
+import tempfile
+import time
+
+import duckdb
+from dotenv import load_dotenv
+
+import warehouse
+
+load_dotenv()
+
+DUCKDB_PATH = os.getenv("DUCKDB_PATH")
+STAGING_TABLE = "staging.technical_field_job_ads"
+DBT_PROJECT_DIR = Path(__file__).resolve().parents[1] / "data_transformation"
+DBT_PROFILES_DIR = Path.home() / ".dbt"
+
+# tables compared between the builds, with the columns left out of the comparison;
+# aggregates keep emptied keys as zero rows and their own load watermark
+COMPARED_TABLES = {
+    "warehouse.fct_job_ads": ("dlt_load_id",),
+    "warehouse.agg_occupation_deadline": ("applied_load_id",),
+    "warehouse.agg_location_occupation": ("applied_load_id",),
+}
+MART_SCHEMA = "marts"
+
+
+def dbt_build(database, profiles_dir, *args):
+    from dbt.cli.main import dbtRunner
+
+    os.environ["DUCKDB_PATH"] = str(database)  # the profile reads the path from it
+    result = dbtRunner().invoke([
+        "build", "--quiet", *args,
+        "--project-dir", str(DBT_PROJECT_DIR), "--profiles-dir", str(profiles_dir),
+        "--target-path", str(Path(database).parent / "target"),
+    ])
+    if not result.success:
+        raise SystemExit(f"dbt build {' '.join(args)} failed on {database}: {result.exception or 'see above'}")
+
+
+def change_ads(database, edits):
+    """Apply one round of changes to the staging rows, as a new load."""
+    load_id = f"{time.time():.6f}"
+    with duckdb.connect(str(database)) as con:
+        # the models pick up loads newer than the last one built, as strings
+        (newest,) = con.sql(f"select max(_dlt_load_id) from {STAGING_TABLE}").fetchone()
+        if newest is not None and newest >= load_id:
+            raise SystemExit(f"{STAGING_TABLE} has load {newest}, newer than a load now ({load_id})")
+        live = [row[0] for row in con.sql(
+            f"select id from {STAGING_TABLE} where not coalesce(removed, false) order by id"
+        ).fetchall()]
+        occupations = con.sql(
+            f"select distinct occupation__label, occupation_group__label, occupation_field__label"
+            f" from {STAGING_TABLE} where occupation__label is not null order by all"
+        ).fetchall()
+        for position, change in edits:
+            ad_id = live[position]
+            if change == "remove":
+                con.execute(f"update {STAGING_TABLE} set removed = true, _dlt_load_id = ? where id = ?", [load_id, ad_id])
+            elif change == "copy":
+                con.execute(
+                    f"insert into {STAGING_TABLE} select * replace ('copy-' || id as id, ? as _dlt_load_id,"
+                    f" null as number_of_vacancies) from {STAGING_TABLE} where id = ?",
+                    [load_id, ad_id],
+                )
+            else:
+                # vacancies: null, or a new count, and a move to another occupation
+                vacancies = None if change == "no_vacancies" else position % 5 + 1
+                con.execute(
+                    f"update {STAGING_TABLE} set number_of_vacancies = ?, occupation__label = ?,"
+                    f" occupation_group__label = ?, occupation_field__label = ?, _dlt_load_id = ? where id = ?",
+                    [vacancies, *occupations[position % len(occupations)], load_id, ad_id],
+                )
+
+
+def differences(incremental, full):
+    """Row counts by which the tables of the two builds differ."""
+    # the catalogs are named after the files; the same config as dbt's open connections
+    with duckdb.connect(str(full)) as con:
+        con.execute(f"attach '{incremental}'")
+        tables = dict(COMPARED_TABLES)
+        for (mart,) in con.sql(f"select table_name from information_schema.tables where table_schema = '{MART_SCHEMA}'").fetchall():
+            tables[f"{MART_SCHEMA}.{mart}"] = ()
+        found = {}
+        for table, left_out in tables.items():
+            exclude = f" exclude ({', '.join(left_out)})" if left_out else ""
+            live = " where job_ads_count <> 0" if table.startswith("warehouse.agg_") else ""
+            full_rows = f"select *{exclude} from full_refresh.{table}{live}"
+            incremental_rows = f"select *{exclude} from incremental.{table}{live}"
+            differing = con.sql(f"""
+                select (select count(*) from ({full_rows} except all {incremental_rows}))
+                     + (select count(*) from ({incremental_rows} except all {full_rows}))
+            """).fetchone()[0]
+            if differing:
+                found[table] = differing
+        return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles-dir", default=str(DBT_PROFILES_DIR))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        incremental = Path(tmp) / "incremental" / "incremental.duckdb"
+        full = Path(tmp) / "full" / "full_refresh.duckdb"
+        incremental.parent.mkdir()
+        full.parent.mkdir()
+        warehouse.copy_duckdb(DUCKDB_PATH, incremental)
+        dbt_build(incremental, args.profiles_dir)  # start from a warehouse up to date with staging
+
+        rounds = [
+            # some ads lose their vacancy count, others change, one is removed, one added without a count
+            [(0, "no_vacancies"), (1, "no_vacancies"), (2, "edit"), (3, "remove"), (4, "copy")],
+            # ads without a count are removed or get one again, and a counted one loses it
+            [(0, "remove"), (1, "edit"), (5, "no_vacancies"), (6, "copy")],
+        ]
+        for edits in rounds:
+            change_ads(incremental, edits)
+            dbt_build(incremental, args.profiles_dir)
+
+        # dbt keeps its connection open, write its wal into the file before copying that
+        with duckdb.connect(str(incremental)) as con:
+            con.execute("checkpoint")
+        shutil.copy(incremental, full)
+        dbt_build(full, args.profiles_dir, "--full-refresh")
+
+        found = differences(incremental, full)
+        for table, differing in found.items():
+            print(f"{table}: {differing} rows differ from a full refresh")
+        if found:
+            sys.exit(1)
+        print(f"incremental builds equal a full refresh ({len(rounds)} rounds of changes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# ==================== #
+#    Startup budget    #
+# ==================== #
+# Loads definitions.py in a fresh interpreter, the way a code-location reload
+# does, and fails when it takes longer than the budget or imports a module
+# that should only be imported once an asset runs.
+#
+#   python check_startup.py                # budget from STARTUP_BUDGET_SECONDS, default 8
+#   STARTUP_BUDGET_SECONDS=4 python check_startup.py
+#
+# The first load after a dbt file changed also parses the project; run it twice
+# to check the cached case.
+
+import json
+import os
+from pathlib import Path
+import subprocess
+import sys
+
+BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "8"))
+
+# only needed by the assets at run time
+LAZY_MODULES = ["dlt", "dagster_dlt", "duckdb", "load_job_ads"]
+
+PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import definitions
+seconds = time.perf_counter() - started
+print(json.dumps({{"seconds": seconds, "imported": [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def main():
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=Path(__file__).parent,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"definitions.py failed to load:\n{result.stderr}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    print(f"definitions.py loaded in {report['seconds']:.2f}s (budget {BUDGET_SECONDS:.2f}s)")
+    problems = []
+    if report["seconds"] > BUDGET_SECONDS:
+        problems.append(f"startup took {report['seconds']:.2f}s, over the {BUDGET_SECONDS:.2f}s budget")
+    if report["imported"]:
+        problems.append(f"imported at load time instead of lazily: {', '.join(report['imported'])}")
+    if problems:
+        sys.exit("\n".join(problems))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# ==================== #
+#  In-process dbt run  #
+# ==================== #
+# Runs dbt through its python api (dbtRunner) inside the dagster process instead
+# of spawning the dbt CLI, so dbt and the adapter are imported once per process.
+# Chosen in definitions.py with DBT_EXECUTION_MODE=in_process.
+
+import queue
+import threading
+
+from dagster_dbt import DagsterDbtTranslator
+from dagster_dbt.asset_utils import get_updated_cli_invocation_params_for_context
+from dagster_dbt.core.dbt_cli_event import DbtCoreCliEventMessage
+from dbt.cli.main import dbtRunner, dbtRunnerResult
+from dbt_common.events.functions import msg_to_dict
+
+# the dbt events dagster turns into materializations and check results
+RESULT_EVENTS = {"LogSeedResult", "LogModelResult", "LogSnapshotResult", "LogTestResult"}
+
+
+class InProcessDbt:
+    """A dbt project invoked through dbtRunner, one instance per process.
+
+    Every invocation parses the project again, with partial parsing against
+    target_path: a tenth of a second when the files are unchanged, and a fresh
+    manifest each time. dbt marks the nodes it compiles in the manifest it runs
+    with, and a Manifest does not survive copy.deepcopy in dbt-core 1.10 (its
+    __reduce_ex__ shifts the lazy lookups into the wrong fields), so one parsed
+    manifest is not shared between invocations.
+    """
+
+    _by_project = {}  # (project dir, project hash) -> InProcessDbt
+
+    def __init__(self, project_dir, profiles_dir, target_path):
+        self.project_dir = project_dir
+        self.profiles_dir = profiles_dir
+        self.target_path = target_path
+
+    @classmethod
+    def for_project(cls, project_dir, profiles_dir, target_path, project_hash):
+        key = (str(project_dir), project_hash)
+        if key not in cls._by_project:
+            cls._by_project.clear()  # the target path of changed files is never used again
+            cls._by_project[key] = cls(project_dir, profiles_dir, target_path)
+        return cls._by_project[key]
+
+    def _flags(self):
+        return [
+            "--project-dir", str(self.project_dir),
+            "--profiles-dir", str(self.profiles_dir),
+            "--target-path", str(self.target_path),
+        ]
+
+    def invoke(self, args, callbacks=()):
+        """Run a dbt command and return its dbtRunnerResult, raising when it fails."""
+        runner = dbtRunner(callbacks=list(callbacks))
+        return _raise_on_failure(args, runner.invoke([*args, *self._flags()]))
+
+    def ls(self, args):
+        """Output lines of `dbt ls`, like the CLI prints them."""
+        return self.invoke(["ls", *args]).result
+
+    def stream(self, args, context):
+        """Run a dbt command for the assets selected in `context` and yield the dagster
+        events for each model and test as soon as dbt finishes it."""
+        params = get_updated_cli_invocation_params_for_context(
+            context=context, manifest={}, dagster_dbt_translator=DagsterDbtTranslator()
+        )
+        args = [*args, *params.selection_args]
+        if params.indirect_selection:
+            args += ["--indirect-selection", params.indirect_selection]
+
+        # dbt calls the callbacks on its own thread, hand the events over through a queue
+        events = queue.Queue()
+        finished = object()
+
+        def on_event(event):
+            if event.info.name in RESULT_EVENTS:
+                events.put(msg_to_dict(event))
+
+        def invoke():
+            try:
+                self.invoke(args, callbacks=[on_event])
+            except BaseException as exc:
+                events.put(exc)
+            else:
+                events.put(finished)
+
+        threading.Thread(target=invoke, name="dbt", daemon=True).start()
+        while True:
+            event = events.get()
+            if event is finished:
+                return
+            if isinstance(event, BaseException):
+                raise event
+            yield from DbtCoreCliEventMessage(raw_event=event, event_history_metadata={}).to_default_asset_events(
+                manifest=params.manifest,
+                dagster_dbt_translator=params.dagster_dbt_translator,
+                context=context,
+                target_path=self.target_path,
+            )
+
+
+def _raise_on_failure(args, result: dbtRunnerResult):
+    if result.success:
+        return result
+    if result.exception is not None:
+        raise result.exception
+    raise RuntimeError(f"dbt {' '.join(args[:1])} failed, see the dbt events above")
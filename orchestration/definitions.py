@@ -2,14 +2,22 @@
 #       imports        #
 # ==================== #
 from dotenv import load_dotenv
+import hashlib
+import json
 import os
 from pathlib import Path
+import shutil
+import statistics
 import sys
+import time
 
-import dlt
 import dagster as dg
-from dagster_dlt import DagsterDltResource, dlt_assets
-from dagster_dbt import DbtCliResource, DbtProject, dbt_assets
+from dagster_dbt import DbtCliResource, DbtProject, dbt_assets, get_asset_key_for_model
+
+import warehouse
+
+# dlt, duckdb and the load script are imported inside the assets that use them,
+# loading the code location only needs the asset graph
 
 # Load environment variables from .env
 load_dotenv()
@@ -17,26 +25,71 @@ load_dotenv()
 # ==================== #
 #   Import DLT script   #
 # ==================== #
-sys.path.insert(0, '../data_extract_load')
-from load_job_ads import jobads_source
+# absolute, so it does not depend on the directory dagster is started from
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "data_extract_load"))
 
 DUCKDB_PATH = os.getenv("DUCKDB_PATH")  # ex: ./data/job_ads.duckdb
+# every asset that writes or copies DUCKDB_PATH runs in this pool; dagster.yaml
+# gives it one slot, so loads, builds, maintenance and snapshots never overlap
+DUCKDB_POOL = "duckdb"
+
+# ==================== #
+#      Partitions      #
+# ==================== #
+# one partition per publication day, in the api's own (Swedish) time
+daily_partitions = dg.DailyPartitionsDefinition(start_date="2025-01-01", timezone="Europe/Stockholm")
+
+# a backfill runs as one run over the whole range: duckdb takes a single writer,
+# so the days are fanned out inside the run instead (one /search shard per day)
+backfill_policy = dg.BackfillPolicy.single_run()
+
+def partition_window(context: dg.AssetExecutionContext):
+    """Start and end of the partition (or backfill range) as naive local ISO datetimes."""
+    window = context.partition_time_window
+    return window.start.strftime("%Y-%m-%dT%H:%M:%S"), window.end.strftime("%Y-%m-%dT%H:%M:%S")
 
 # ==================== #
 #       DLT Asset      #
 # ==================== #
-dlt_resource = DagsterDltResource()
+DLT_ASSET_KEY = dg.AssetKey("dlt_jobads_source_jobads_resource")
+STAGING_TABLE = "technical_field_job_ads"
 
-@dlt_assets(
-    dlt_source=jobads_source(),
-    dlt_pipeline=dlt.pipeline(
+# same key, upstream and kinds as dagster-dlt's @dlt_assets gave it, but a plain
+# asset does not need the dlt source object (and dlt) to build the asset graph
+@dg.asset(
+    key=DLT_ASSET_KEY,
+    deps=[dg.AssetKey("jobads_source_jobads_resource")],
+    kinds={"dlt", "duckdb"},
+    partitions_def=daily_partitions,
+    backfill_policy=backfill_policy,
+    pool=DUCKDB_POOL,
+)
+def dlt_load(context: dg.AssetExecutionContext):
+    import dlt
+    from load_job_ads import jobads_source
+
+    pipeline = dlt.pipeline(
         pipeline_name="jobsearch",
         dataset_name="staging",
         destination=dlt.destinations.duckdb(DUCKDB_PATH),
-    ),
-)
-def dlt_load(context: dg.AssetExecutionContext, dlt: DagsterDltResource):
-    yield from dlt.run(context=context)
+    )
+    published_after, published_before = partition_window(context)
+    load_info = pipeline.run(jobads_source(published_after=published_after, published_before=published_before))
+    load_info.raise_on_failed_jobs()
+
+    # what the load actually changed, read by dlt_load_sensor
+    stats = pipeline.state["sources"]["jobads_source"]["resources"]["jobads_resource"]["last_run_stats"]
+    return dg.MaterializeResult(
+        metadata={
+            "load_id": load_info.loads_ids[-1] if load_info.loads_ids else None,
+            "rows_loaded": pipeline.last_trace.last_normalize_info.row_counts.get(STAGING_TABLE, 0),
+            "written_ads": stats["written"],
+            "removed_ads": stats["removed"],
+            "unchanged_ads": stats["skipped"],
+            "truncated_queries": stats["truncated_queries"],
+            "content_fingerprint": stats["fingerprint"],
+        },
+    )
 
 # ==================== #
 #       DBT Asset      #
@@ -54,44 +107,362 @@ dbt_resource = DbtCliResource(
     profiles_dir=dbt_profiles_dir
 )
 
-# Kompilera dbt-projektet så Dagster kan bygga asset-graph
-dbt_project.prepare_if_dev()
+# Kompilera dbt-projektet så Dagster kan bygga asset-graph, men bara när filerna ändrats
+manifest_cache_dir = dbt_project_dir / "target" / "manifest_cache"
+DBT_PROJECT_IGNORE = {"target", "dbt_packages", "logs"}
+
+def dbt_project_hash():
+    """Hash of every file dbt parses; a change to any of them needs a new manifest."""
+    digest = hashlib.sha256()
+    for path in sorted(dbt_project_dir.rglob("*")):
+        relative = path.relative_to(dbt_project_dir)
+        if path.is_file() and relative.parts[0] not in DBT_PROJECT_IGNORE:
+            digest.update(str(relative).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+def cached_manifest_path():
+    """manifest.json for the current project files, parsed only on a cache miss."""
+    cache_dir = manifest_cache_dir / dbt_project_hash()
+    manifest_path = cache_dir / "manifest.json"
+    if not manifest_path.exists():
+        if dbt_project.has_uninstalled_deps:
+            dbt_resource.cli(["deps", "--quiet"], target_path=cache_dir).wait()
+        dbt_resource.cli(["parse", "--quiet"], target_path=cache_dir).wait()
+        # manifests of older project versions are never read again
+        for old_dir in manifest_cache_dir.iterdir():
+            if old_dir != cache_dir:
+                shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest_path
 
-@dbt_assets(manifest=dbt_project.manifest_path)
+# manifest and src model fingerprints of the last full successful build, what the next build is compared with
+dbt_state_dir = dbt_project_dir / "target" / "last_build"
+src_models_dir = dbt_project_dir / "models" / "src"
+
+def src_model_fingerprints():
+    """Per src model, the count and summed hashes of the live staging rows in the
+    columns it selects, or None when staging can't be read. Equal fingerprints mean
+    the model reads the same rows, however many loads rewrote them in between."""
+    import duckdb
+    from job_ad_schema import columns_read_by_src_model
+
+    models = sorted(path.stem for path in src_models_dir.glob("*.sql"))
+    hashes = [
+        f"sum(hash({', '.join(sorted(columns_read_by_src_model(src_models_dir / f'{model}.sql')))}))::varchar"
+        for model in models
+    ]
+    try:
+        # not read_only: in-process dbt keeps the file open with the default config,
+        # and only the pipeline opens DUCKDB_PATH (the dashboard reads snapshots)
+        with duckdb.connect(DUCKDB_PATH) as con:
+            count, *sums = con.sql(
+                f"select count(*), {', '.join(hashes)} from staging.{STAGING_TABLE} where not coalesce(removed, false)"
+            ).fetchone()
+    except duckdb.Error:
+        return None
+    return {model: f"{count}:{total}" for model, total in zip(models, sums)}
+
+def cli_ls(dbt: DbtCliResource, args):
+    """Output lines of `dbt ls` through the dbt CLI."""
+    return [
+        event.raw_event["info"]["msg"]
+        for event in dbt.cli(["ls", *args]).stream_raw_events()
+        # ls lines come as ListCmdOut, or PrintEvent when dbt's output is not a terminal
+        if event.raw_event["info"]["name"] in ("ListCmdOut", "PrintEvent")
+    ]
+
+def unaffected_dbt_nodes(ls, changed_src_models):
+    """Models and tests whose files and inputs are unchanged since the last full successful build."""
+    if not (dbt_state_dir / "manifest.json").exists():
+        return []  # nothing to compare with, build everything
+    affected = ["state:modified+"] + [f"{model}+" for model in changed_src_models]
+    lines = ls([
+        "--resource-type", "model", "--resource-type", "test",
+        "--exclude", *affected, "--state", str(dbt_state_dir),
+        "--output", "json", "--output-keys", "name resource_type",
+    ])
+    return [json.loads(line) for line in lines]
+
+def dbt_model_stats(target_path: Path):
+    """Numeric metadata for every model the last dbt command built, by unique id: the
+    rows it affected where the adapter reports them, and for models stored as tables
+    their rows and bytes in duckdb."""
+    import duckdb
+
+    run_results = json.loads((target_path / "run_results.json").read_text())["results"]
+    nodes = json.loads((target_path / "manifest.json").read_text())["nodes"]
+    stats = {}
+    for result in run_results:
+        if result["unique_id"].startswith("model.") and result["status"] == "success":
+            stats[result["unique_id"]] = {}
+            # dbt-duckdb does not report it today, other adapters do
+            rows_affected = result["adapter_response"].get("rows_affected", -1)
+            if rows_affected >= 0:
+                stats[result["unique_id"]]["rows_affected"] = dg.MetadataValue.int(rows_affected)
+
+    try:
+        with duckdb.connect(DUCKDB_PATH) as con:  # same config as dbt, see src_model_fingerprints
+            block_size = con.sql("select block_size from pragma_database_size()").fetchone()[0]
+            for unique_id, model_stats in stats.items():
+                node = nodes[unique_id]
+                relation = f'"{node["schema"]}"."{node["alias"]}"'
+                is_table = con.execute(
+                    "select count(*) from duckdb_tables() where schema_name = ? and table_name = ?",
+                    [node["schema"], node["alias"]],
+                ).fetchone()[0]
+                if not is_table:
+                    continue  # views store nothing, their cost is paid when they are read
+                blocks = con.sql(
+                    f"select count(distinct block_id) from pragma_storage_info('{relation}') where block_id >= 0"
+                ).fetchone()[0]
+                model_stats["dagster/row_count"] = dg.MetadataValue.int(con.sql(f"select count(*) from {relation}").fetchone()[0])
+                model_stats["storage_bytes"] = dg.MetadataValue.int(blocks * block_size)
+    except duckdb.Error:
+        pass  # rows_affected is still worth recording
+    return {unique_id: model_stats for unique_id, model_stats in stats.items() if model_stats}
+
+# "cli" spawns the dbt CLI for every command, "in_process" runs dbt inside the
+# dagster process, partially parsing the project again for every command
+DBT_EXECUTION_MODE = os.getenv("DBT_EXECUTION_MODE", "cli")
+
+dbt_manifest_path = cached_manifest_path()
+
+# not partitioned: the models are incremental on load ids, not publication days,
+# so a build takes in whatever the loads since the last one changed
+@dbt_assets(manifest=dbt_manifest_path, pool=DUCKDB_POOL)
 def dbt_models(context: dg.AssetExecutionContext, dbt: DbtCliResource):
-    yield from dbt.cli(["build"], context=context).stream()
+    in_process = None
+    if DBT_EXECUTION_MODE == "in_process":
+        from dbt_in_process import InProcessDbt
+
+        # the manifest cache dir keeps the partial parse of exactly these project files
+        in_process = InProcessDbt.for_project(
+            dbt_project_dir, dbt_profiles_dir, dbt_manifest_path.parent, project_hash=dbt_manifest_path.parent.name
+        )
+
+    # only build what changed model files or src models reading changed rows can reach
+    fingerprints = src_model_fingerprints()
+    last_build = dbt_state_dir / "last_build.json"
+    built = json.loads(last_build.read_text()).get("src_fingerprints", {}) if last_build.exists() else {}
+    if fingerprints is None:
+        changed_src_models = sorted(path.stem for path in src_models_dir.glob("*.sql"))
+    else:
+        changed_src_models = [model for model, fingerprint in fingerprints.items() if built.get(model) != fingerprint]
+    ls = in_process.ls if in_process else lambda args: cli_ls(dbt, args)
+    unaffected = unaffected_dbt_nodes(ls, changed_src_models)
+
+    for node in unaffected:
+        if node["resource_type"] != "model":
+            continue
+        asset_key = get_asset_key_for_model([context.assets_def], node["name"])
+        if asset_key in context.selected_asset_keys:
+            yield dg.AssetObservation(asset_key=asset_key, metadata={"skipped": "inputs unchanged since last build"})
+    context.log.info(f"skipping {len(unaffected)} unaffected dbt models and tests")
+
+    args = ["build"]
+    if unaffected:
+        args += ["--exclude", *[node["name"] for node in unaffected], "--defer", "--state", str(dbt_state_dir)]
+    if in_process:
+        events = in_process.stream(args, context)
+        target_path = dbt_manifest_path.parent
+    else:
+        invocation = dbt.cli(args, context=context)
+        events = invocation.stream()
+        target_path = invocation.target_path
+
+    # materializations go out as dbt reports them, with its execution time; duckdb
+    # can only be read once dbt has let go of it, so table sizes follow as observations
+    built = {}  # unique id -> asset key
+    for event in events:
+        if isinstance(event, dg.Output) and "unique_id" in event.metadata:
+            built[event.metadata["unique_id"].value] = context.asset_key_for_output(event.output_name)
+            if "Execution Duration" in event.metadata:
+                event = event.with_metadata({**event.metadata, "execution_time": event.metadata["Execution Duration"]})
+        yield event
+    for unique_id, model_stats in dbt_model_stats(target_path).items():
+        if unique_id in built:
+            yield dg.AssetObservation(asset_key=built[unique_id], metadata=model_stats)
+
+    # both streams raise on failure, so this only records successful builds; a
+    # subset run leaves the unselected models as they were, it can't stand for them
+    # (context.assets_def is already the subset there, compare with the whole definition)
+    full_build = (
+        context.selected_asset_keys == set(dbt_models.keys)
+        and context.selected_asset_check_keys == set(dbt_models.check_keys)
+    )
+    if full_build and fingerprints is not None:
+        dbt_state_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(target_path / "manifest.json", dbt_state_dir / "manifest.json")
+        last_build.write_text(json.dumps({"src_fingerprints": fingerprints}))
+
+# ==================== #
+#  DuckDB maintenance  #
+# ==================== #
+# database wide, so not partitioned; runs in its own job after every successful
+# job_dbt run, dbt_models skipping unaffected models would skip it inside job_dbt
+@dg.asset(deps=dbt_models.keys, kinds={"duckdb"}, pool=DUCKDB_POOL)
+def duckdb_maintenance(context: dg.AssetExecutionContext):
+    """Checkpoint the warehouse, refresh its statistics and, when enough of the file is
+    free blocks left behind by replaced tables, rewrite it into a compact file."""
+    result = warehouse.maintain(DUCKDB_PATH)
+    if result["compacted"]:
+        context.log.info(f"compacted {DUCKDB_PATH}, {result['free_block_ratio']:.0%} of its blocks were free")
+
+    return dg.MaterializeResult(
+        metadata={
+            "size_before_bytes": dg.MetadataValue.int(result["size_before_bytes"]),
+            "size_after_bytes": dg.MetadataValue.int(result["size_after_bytes"]),
+            "free_block_ratio": dg.MetadataValue.float(result["free_block_ratio"]),
+            "compacted": result["compacted"],
+        },
+    )
+
+# ==================== #
+#  Snapshot publishing #
+# ==================== #
+# the dashboard reads published snapshots, never DUCKDB_PATH itself (see warehouse.py)
+@dg.asset(deps=[duckdb_maintenance], kinds={"duckdb"}, pool=DUCKDB_POOL)
+def duckdb_snapshot(context: dg.AssetExecutionContext):
+    """Copy the warehouse into a new snapshot version and point CURRENT at it."""
+    result = warehouse.publish_snapshot(DUCKDB_PATH)
+    return dg.MaterializeResult(
+        metadata={
+            "version": result["version"],
+            "path": result["path"],
+            "size_bytes": dg.MetadataValue.int(result["size_bytes"]),
+        },
+    )
+
+# ==================== #
+#     Asset checks     #
+# ==================== #
+# warn when a model takes longer than this many times its median runtime,
+# e.g. DBT_RUNTIME_REGRESSION_RATIO=1.5
+RUNTIME_REGRESSION_RATIO = float(os.getenv("DBT_RUNTIME_REGRESSION_RATIO", "2.0"))
+RUNTIME_HISTORY = 20  # materializations the median is taken over
+RUNTIME_MIN_HISTORY = 5  # fewer earlier runs than this is too little to compare with
+RUNTIME_MIN_SECONDS = 1.0  # faster models are all noise, never flagged
+
+@dg.multi_asset_check(
+    specs=[dg.AssetCheckSpec("runtime_regression", asset=key) for key in dbt_models.keys],
+    can_subset=True,
+)
+def dbt_runtime_regression(context: dg.AssetCheckExecutionContext):
+    """Compare each model's runtime in this run with the median of its earlier materializations."""
+    for check_key in context.selected_asset_check_keys:
+        records = context.instance.fetch_materializations(check_key.asset_key, limit=RUNTIME_HISTORY + 1).records
+        runtimes = [
+            record.asset_materialization.metadata["execution_time"].value
+            for record in records
+            if "execution_time" in record.asset_materialization.metadata
+        ]
+        if not records or records[0].run_id != context.run.run_id:
+            description = "not built in this run"
+        elif len(runtimes) <= RUNTIME_MIN_HISTORY:
+            description = f"{len(runtimes) - 1} earlier runs, {RUNTIME_MIN_HISTORY} needed to compare with"
+        else:
+            latest, median = runtimes[0], statistics.median(runtimes[1:])
+            ratio = latest / median if median else 1.0
+            yield dg.AssetCheckResult(
+                asset_key=check_key.asset_key,
+                check_name=check_key.name,
+                passed=latest < RUNTIME_MIN_SECONDS or ratio <= RUNTIME_REGRESSION_RATIO,
+                severity=dg.AssetCheckSeverity.WARN,
+                metadata={
+                    "execution_time": latest,
+                    "median_execution_time": median,
+                    "ratio": ratio,
+                    "max_ratio": RUNTIME_REGRESSION_RATIO,
+                },
+            )
+            continue
+        yield dg.AssetCheckResult(
+            asset_key=check_key.asset_key, check_name=check_key.name, passed=True, description=description
+        )
 
 # ==================== #
 #         Jobs         #
 # ==================== #
-job_dlt = dg.define_asset_job("job_dlt", selection=dg.AssetSelection.keys("dlt_jobads_source_jobads_resource"))
+job_dlt = dg.define_asset_job("job_dlt", selection=dg.AssetSelection.assets(DLT_ASSET_KEY))
 job_dbt = dg.define_asset_job("job_dbt", selection=dg.AssetSelection.key_prefixes("warehouse", "marts"))
+job_duckdb_maintenance = dg.define_asset_job(
+    "job_duckdb_maintenance", selection=dg.AssetSelection.assets(duckdb_maintenance, duckdb_snapshot)
+)
 
 # ==================== #
 #       Schedule       #
 # ==================== #
-schedule_dlt = dg.ScheduleDefinition(
-    job=job_dlt,
-    cron_schedule="25 11 * * *"  # UTC
-)
+# same run time as before partitioning; loads yesterday's partition (a Stockholm day)
+@dg.schedule(job=job_dlt, cron_schedule="25 11 * * *", execution_timezone="UTC")
+def schedule_dlt(context: dg.ScheduleEvaluationContext):
+    day_before = context.scheduled_execution_time.timestamp() - 24 * 60 * 60
+    return dg.RunRequest(partition_key=daily_partitions.get_partition_key_for_timestamp(day_before))
 
 # ==================== #
 #        Sensor        #
 # ==================== #
-@dg.asset_sensor(
-    asset_key=dg.AssetKey("dlt_jobads_source_jobads_resource"),
-    job_name="job_dbt"
+SENSOR_SETTLE_SECONDS = 60  # a burst of loads must be quiet this long before dbt runs
+
+@dg.sensor(job_name="job_dbt", minimum_interval_seconds=30)
+def dlt_load_sensor(context: dg.SensorEvaluationContext):
+    """Start one job_dbt run for all new loads that changed data.
+
+    The cursor keeps the last seen materialization and, per partition, the content
+    fingerprint dbt was last asked to build. Loads that wrote nothing and reruns
+    that wrote the same rows again are skipped; a burst of loads is coalesced into
+    one run.
+    """
+    cursor = json.loads(context.cursor) if context.cursor else {"storage_id": None, "fingerprints": {}}
+    records = context.instance.fetch_materializations(
+        dg.AssetRecordsFilter(asset_key=DLT_ASSET_KEY, after_storage_id=cursor["storage_id"]),
+        limit=1000,
+        ascending=True,
+    ).records
+    if not records:
+        return dg.SkipReason("no new loads")
+    if time.time() - records[-1].timestamp < SENSOR_SETTLE_SECONDS:
+        return dg.SkipReason("waiting for the latest loads to settle")
+
+    changed = {}
+    for record in records:
+        metadata = record.asset_materialization.metadata
+        # materializations from before the asset was partitioned have no partition key
+        partition = record.partition_key or "unpartitioned"
+        if "written_ads" in metadata and metadata["written_ads"].value + metadata["removed_ads"].value == 0:
+            continue  # nothing written
+        # loads from before the fingerprint existed always count as changed
+        fingerprint = metadata["content_fingerprint"].value if "content_fingerprint" in metadata else str(record.storage_id)
+        if cursor["fingerprints"].get(partition) == fingerprint:
+            continue  # the same rows loaded again
+        cursor["fingerprints"][partition] = fingerprint
+        changed[partition] = fingerprint
+
+    cursor["storage_id"] = records[-1].storage_id
+    context.update_cursor(json.dumps(cursor))
+    if not changed:
+        return dg.SkipReason(f"{len(records)} new loads changed no data")
+
+    # the newest storage id too: a partition can come back to a fingerprint it had before
+    run_key = hashlib.sha1(json.dumps([records[-1].storage_id, sorted(changed.items())]).encode()).hexdigest()
+    return dg.RunRequest(run_key=run_key)
+
+@dg.run_status_sensor(
+    run_status=dg.DagsterRunStatus.SUCCESS,
+    monitored_jobs=[job_dbt],
+    request_job=job_duckdb_maintenance,
 )
-def dlt_load_sensor():
-    yield dg.RunRequest()
+def duckdb_maintenance_sensor(context: dg.RunStatusSensorContext):
+    """Checkpoint, if needed compact, and publish the warehouse after every dbt build."""
+    return dg.RunRequest(run_key=context.dagster_run.run_id)
 
 # ==================== #
 #     Definitions      #
 # ==================== #
 defs = dg.Definitions(
-    assets=[dlt_load, dbt_models],
-    resources={"dlt": dlt_resource, "dbt": dbt_resource},
-    jobs=[job_dlt, job_dbt],
+    assets=[dlt_load, dbt_models, duckdb_maintenance, duckdb_snapshot],
+    asset_checks=[dbt_runtime_regression],
+    resources={"dbt": dbt_resource},
+    jobs=[job_dlt, job_dbt, job_duckdb_maintenance],
     schedules=[schedule_dlt],
-    sensors=[dlt_load_sensor],
+    sensors=[dlt_load_sensor, duckdb_maintenance_sensor],
 )
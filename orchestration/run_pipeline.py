@@ -0,0 +1,128 @@
+# ==================== #
+#   Headless pipeline  #
+# ==================== #
+# Runs the same dlt load and dbt build as the dagster jobs in definitions.py, in
+# one process and without the webserver, daemon or code server. Meant for cron
+# runs and for timing pipeline changes.
+#
+#   python run_pipeline.py                          # every stage, full load
+#   python run_pipeline.py --partition 2026-09-10   # one publication day, merged
+#   python run_pipeline.py --stages dbt publish --output report.json
+#
+# Prints one json line per stage with its seconds and row counts and exits with
+# 1 as soon as a stage fails; the stages that ran are still reported.
+
+import argparse
+from datetime import date, timedelta
+import json
+import os
+from pathlib import Path
+import sys
+import time
+
+from dotenv import load_dotenv
+
+import warehouse
+
+load_dotenv()
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "data_extract_load"))
+
+DUCKDB_PATH = os.getenv("DUCKDB_PATH")
+STAGING_TABLE = "technical_field_job_ads"
+DBT_PROJECT_DIR = Path(__file__).resolve().parents[1] / "data_transformation"
+DBT_PROFILES_DIR = Path.home() / ".dbt"
+
+STAGES = ["extract", "normalize", "load", "dbt", "publish"]
+
+
+class Pipeline:
+    """The stages of one run; each returns the numbers reported for it."""
+
+    def __init__(self, partition=None):
+        import dlt
+
+        self.partition = partition
+        self.pipeline = dlt.pipeline(
+            pipeline_name="jobsearch",
+            dataset_name="staging",
+            destination=dlt.destinations.duckdb(DUCKDB_PATH),
+        )
+
+    def window(self):
+        """Publication window of the partition, as dagster passes it to the assets."""
+        if self.partition is None:
+            return None, None
+        day = date.fromisoformat(self.partition)
+        return f"{day}T00:00:00", f"{day + timedelta(days=1)}T00:00:00"
+
+    def extract(self):
+        from load_job_ads import jobads_source
+
+        published_after, published_before = self.window()
+        self.pipeline.extract(jobads_source(published_after=published_after, published_before=published_before))
+        stats = self.pipeline.state["sources"]["jobads_source"]["resources"]["jobads_resource"]["last_run_stats"]
+        return {"rows": stats["written"] + stats["removed"], "unchanged_ads": stats["skipped"],
+                "truncated_queries": stats["truncated_queries"]}
+
+    def normalize(self):
+        self.pipeline.normalize()
+        return {"rows": self.pipeline.last_trace.last_normalize_info.row_counts.get(STAGING_TABLE, 0)}
+
+    def load(self):
+        load_info = self.pipeline.load()
+        load_info.raise_on_failed_jobs()
+        return {"load_ids": load_info.loads_ids}
+
+    def dbt(self):
+        from dbt.cli.main import dbtRunner
+
+        result = dbtRunner().invoke([
+            "build", "--quiet",
+            "--project-dir", str(DBT_PROJECT_DIR), "--profiles-dir", str(DBT_PROFILES_DIR),
+        ])
+        if result.exception is not None:
+            raise result.exception
+        statuses = [str(node.status) for node in result.result.results]
+        if not result.success:
+            failed = [node.node.name for node in result.result.results if str(node.status) in ("error", "fail")]
+            raise RuntimeError(f"dbt build failed: {', '.join(failed)}")
+        return {"models": sum(node.node.resource_type == "model" for node in result.result.results),
+                "tests": sum(node.node.resource_type == "test" for node in result.result.results),
+                "warnings": statuses.count("warn")}
+
+    def publish(self):
+        return {**warehouse.maintain(DUCKDB_PATH), **warehouse.publish_snapshot(DUCKDB_PATH)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES,
+                        help="stages to run, in pipeline order (default: all)")
+    parser.add_argument("--partition", help="publication day YYYY-MM-DD to load instead of everything")
+    parser.add_argument("--output", help="also write the report as json to this file")
+    args = parser.parse_args()
+
+    pipeline = Pipeline(args.partition)
+    report = []
+    for stage in [stage for stage in STAGES if stage in args.stages]:
+        started = time.perf_counter()
+        row = {"stage": stage}
+        try:
+            row.update(getattr(pipeline, stage)())
+            row["status"] = "success"
+        except Exception as exc:
+            row.update(status="failed", error=f"{type(exc).__name__}: {exc}")
+        row["seconds"] = round(time.perf_counter() - started, 3)
+        report.append(row)
+        print(json.dumps(row, default=str), flush=True)
+        if row["status"] == "failed":
+            break
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, default=str))
+    if report[-1]["status"] == "failed":
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
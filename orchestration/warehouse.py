@@ -0,0 +1,97 @@
+# ==================== #
+#  Warehouse file ops  #
+# ==================== #
+# Maintenance and snapshot publishing of the duckdb warehouse file, shared by the
+# dagster assets in definitions.py and the headless run_pipeline.py. duckdb is
+# imported inside the functions, loading definitions.py does not need it.
+
+from datetime import datetime, timezone
+import os
+from pathlib import Path
+import shutil
+
+# the dashboard never opens DUCKDB_PATH, which the pipeline writes to, but the
+# newest finished build published as <snapshot dir>/<version>/<db file>, named in
+# <snapshot dir>/CURRENT; by default the snapshot dir is next to DUCKDB_PATH
+KEEP_SNAPSHOTS = 2  # the previous one stays for queries still reading it
+
+
+def duckdb_file_size(path):
+    """Bytes of the database file and its write-ahead log."""
+    return sum(os.path.getsize(file) for file in (path, f"{path}.wal") if os.path.exists(file))
+
+
+def copy_duckdb(source, target):
+    """Write a compact copy of the database in `source` to a new file `target`."""
+    import duckdb
+
+    # the source is attached under its own name, views refer to their tables through it
+    name = Path(source).stem
+    with duckdb.connect() as con:
+        con.execute(f"ATTACH '{source}' AS \"{name}\" (READ_ONLY)")
+        con.execute(f"ATTACH '{target}' AS copy")
+        con.execute(f"COPY FROM DATABASE \"{name}\" TO copy")
+        con.execute("DETACH copy")
+
+
+def maintain(path, compact_free_ratio=None):
+    """Checkpoint the warehouse, refresh its statistics and, when enough of the file is
+    free blocks left behind by replaced tables, rewrite it into a compact file."""
+    import duckdb
+
+    if compact_free_ratio is None:
+        # rewrite once this share of the blocks is free, e.g. DUCKDB_COMPACT_FREE_RATIO=0.5
+        compact_free_ratio = float(os.getenv("DUCKDB_COMPACT_FREE_RATIO", "0.3"))
+
+    size_before = duckdb_file_size(path)
+    with duckdb.connect(path) as con:
+        con.execute("CHECKPOINT")
+        con.execute("ANALYZE")
+        total_blocks, free_blocks = con.sql("select total_blocks, free_blocks from pragma_database_size()").fetchone()
+    free_ratio = free_blocks / total_blocks if total_blocks else 0.0
+
+    compacted = free_ratio >= compact_free_ratio
+    if compacted:
+        compact_path = f"{path}.compact"
+        if os.path.exists(compact_path):
+            os.remove(compact_path)  # left over from an interrupted rewrite
+        copy_duckdb(path, compact_path)
+        os.replace(compact_path, path)
+
+    return {
+        "size_before_bytes": size_before,
+        "size_after_bytes": duckdb_file_size(path),
+        "free_block_ratio": free_ratio,
+        "compacted": compacted,
+    }
+
+
+def snapshot_dir(path):
+    return Path(os.getenv("DUCKDB_SNAPSHOT_DIR", Path(path).parent / "snapshots"))
+
+
+def publish_snapshot(path):
+    """Copy the warehouse into a new snapshot version and point CURRENT at it."""
+    snapshots = snapshot_dir(path)
+    snapshots.mkdir(parents=True, exist_ok=True)
+    for leftover in snapshots.glob(".*.tmp"):
+        shutil.rmtree(leftover, ignore_errors=True)  # from an interrupted publish
+
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")  # sorts by time
+    building = snapshots / f".{version}.tmp"
+    building.mkdir()
+    copy_duckdb(path, building / Path(path).name)
+    os.replace(building, snapshots / version)
+
+    # readers see either the old or the new pointer, never half of one
+    pointer = snapshots / ".CURRENT.tmp"
+    pointer.write_text(version)
+    os.replace(pointer, snapshots / "CURRENT")
+
+    versions = sorted(entry.name for entry in snapshots.iterdir() if entry.is_dir() and not entry.name.startswith("."))
+    for old_version in versions[:-KEEP_SNAPSHOTS]:
+        # a reader may still hold it open on some file systems, the next publish retries
+        shutil.rmtree(snapshots / old_version, ignore_errors=True)
+
+    published = snapshots / version / Path(path).name
+    return {"version": version, "path": str(published), "size_bytes": duckdb_file_size(published)}